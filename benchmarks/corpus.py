@@ -0,0 +1,118 @@
+"""
+Reproducible synthetic comic corpus for the benchmarks.
+
+Pages are drawn from a seeded RNG (panel borders, gradients, line art and
+screentone-like dots), so the same settings always give byte-identical images.
+
+    python benchmarks/corpus.py /tmp/corpus --pages 40 --size 1600x2400
+
+Layout:
+    <root>/folders/<jpeg|png|webp>/   one folder of pages per image format
+    <root>/archives/book.<fmt>        the jpeg folder packed as cbz/7z/epub/pdf
+    <root>/corpus.json                settings; an existing corpus is reused if they match
+"""
+import sys
+import json
+import random
+import argparse
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+PAGE_FORMATS = {'jpeg': ('JPEG', '.jpg'), 'png': ('PNG', '.png'), 'webp': ('WEBP', '.webp')}
+ARCHIVE_FORMATS = ['cbz', '7z', 'epub', 'pdf']
+CORPUS_VERSION = 1
+
+
+def draw_page(rng, size, color):
+    """One page: a grid of panels with gradients, strokes and dot patterns."""
+    from PIL import Image, ImageDraw
+    width, height = size
+    im = Image.new('RGB', size, 'white')
+    draw = ImageDraw.Draw(im)
+    margin = width // 30
+    rows = rng.randint(2, 4)
+    row_h = (height - margin) // rows
+    for r in range(rows):
+        cols = rng.randint(1, 3)
+        col_w = (width - margin) // cols
+        for c in range(cols):
+            box = (margin + c * col_w, margin + r * row_h, (c + 1) * col_w, (r + 1) * row_h)
+            panel_w, panel_h = box[2] - box[0], box[3] - box[1]
+            if panel_w < 8 or panel_h < 8:
+                continue
+            # Background gradient
+            tint = tuple(rng.randint(150, 255) for _ in range(3)) if color else (rng.randint(150, 255),) * 3
+            mask = Image.linear_gradient('L').rotate(rng.choice([0, 90, 180, 270])).resize((panel_w, panel_h))
+            fill = Image.new('RGB', (panel_w, panel_h), tint)
+            im.paste(Image.composite(fill, Image.new('RGB', (panel_w, panel_h), 'white'), mask), box[:2])
+            # Screentone
+            step = rng.randint(6, 14)
+            shade = rng.randint(60, 160)
+            for y in range(box[1], box[3], step):
+                for x in range(box[0] + (y // step % 2) * step // 2, box[2], step):
+                    draw.point((x, y), fill=(shade, shade, shade))
+            # Line art
+            for _ in range(rng.randint(20, 60)):
+                ink = tuple(rng.randint(0, 90) for _ in range(3)) if color else (rng.randint(0, 90),) * 3
+                points = [(rng.randint(box[0], box[2]), rng.randint(box[1], box[3])) for _ in range(rng.randint(2, 5))]
+                draw.line(points, fill=ink, width=rng.randint(1, 4))
+            draw.rectangle(box, outline='black', width=max(2, width // 400))
+    return im
+
+
+def generate(root: Path, pages=24, size=(1600, 2400), color_every=4, seed=0, quality=90):
+    """
+    Create (or reuse) a corpus under root and return its settings dict.
+    Every color_every-th page is in color, the rest are gray manga pages.
+    """
+    from src.core.archive_manager import ArchiveManager
+
+    root = Path(root)
+    settings = {'version': CORPUS_VERSION, 'pages': pages, 'size': list(size), 'color_every': color_every,
+                'seed': seed, 'quality': quality}
+    stamp = root / 'corpus.json'
+    if stamp.exists() and json.loads(stamp.read_text()) == settings:
+        return settings
+
+    rng = random.Random(seed)
+    page_images = [draw_page(rng, size, color_every and i % color_every == 0) for i in range(pages)]
+
+    for fmt, (pil_format, suffix) in PAGE_FORMATS.items():
+        folder = root / 'folders' / fmt
+        folder.mkdir(parents=True, exist_ok=True)
+        for old in folder.iterdir():
+            old.unlink()
+        for i, im in enumerate(page_images):
+            save_args = {} if pil_format == 'PNG' else {'quality': quality}
+            im.save(folder / f"{i + 1:04d}{suffix}", pil_format, **save_args)
+
+    archives = root / 'archives'
+    archives.mkdir(parents=True, exist_ok=True)
+    for fmt in ARCHIVE_FORMATS:
+        ArchiveManager.create_archive(root / 'folders' / 'jpeg', archives / f"book.{fmt}", fmt)
+
+    stamp.write_text(json.dumps(settings))
+    return settings
+
+
+def parse_size(value):
+    width, height = (int(v) for v in value.lower().split('x'))
+    return width, height
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('root', type=Path)
+    parser.add_argument('--pages', type=int, default=24)
+    parser.add_argument('--size', type=parse_size, default=(1600, 2400), metavar='WxH')
+    parser.add_argument('--color-every', type=int, default=4, help='every Nth page is in color (0: none)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    generate(args.root, args.pages, args.size, args.color_every, args.seed)
+    print(f"Corpus ready in {args.root}")
+
+
+if __name__ == '__main__':
+    main()
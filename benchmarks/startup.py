@@ -0,0 +1,83 @@
+"""
+Cold-start import time of the GUI and library entry points.
+
+Every sample imports the entry point in a fresh interpreter, so nothing is
+cached in-process. Also reports which heavy backends each entry point pulls in.
+
+    python benchmarks/startup.py                      # print results
+    python benchmarks/startup.py --save baseline.json # store a baseline
+    python benchmarks/startup.py --baseline baseline.json
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+ENTRY_POINTS = {
+    'gui': 'src.ui.main_window',
+    'cli': 'src.cli',
+    'archive_manager': 'src.core.archive_manager',
+    'comic_folder': 'src.modules.comic_folder.converter',
+    'ebook_to_cbz': 'src.modules.ebook_to_cbz.converter',
+}
+
+HEAVY_MODULES = ['PyQt6', 'pymupdf', 'fitz', 'py7zr', 'PIL', 'rarfile', 'mobi', 'patoolib']
+
+_PROBE = """
+import sys, time, json
+t = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - t
+print(json.dumps({{'seconds': elapsed, 'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module, runs):
+    times = []
+    loaded = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, '-c', _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+            env={**os.environ, 'QT_QPA_PLATFORM': 'offscreen'},
+        ).stdout.strip().splitlines()[-1]
+        sample = json.loads(out)
+        times.append(sample['seconds'])
+        loaded = sample['loaded']
+    return {'median_ms': statistics.median(times) * 1000, 'min_ms': min(times) * 1000, 'loaded': loaded}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-n', '--runs', type=int, default=5, help='fresh interpreters per entry point')
+    parser.add_argument('--only', action='append', choices=list(ENTRY_POINTS), help='entry points to measure')
+    parser.add_argument('--save', type=Path, help='write results as JSON')
+    parser.add_argument('--baseline', type=Path, help='compare against a saved JSON result')
+    args = parser.parse_args(argv)
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else {}
+    results = {}
+    for name in args.only or ENTRY_POINTS:
+        try:
+            results[name] = measure(ENTRY_POINTS[name], args.runs)
+        except subprocess.CalledProcessError as e:
+            print(f"{name:16} failed to import: {e.stderr.strip().splitlines()[-1]}")
+            continue
+        r = results[name]
+        line = f"{name:16} {r['median_ms']:8.1f} ms (min {r['min_ms']:.1f})"
+        if name in baseline:
+            delta = r['median_ms'] - baseline[name]['median_ms']
+            line += f"  {delta:+8.1f} ms vs baseline"
+        print(f"{line}  loads: {', '.join(r['loaded']) or '-'}")
+
+    if args.save:
+        args.save.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+"""
+Throughput, peak memory and scratch-disk use of create/extract/convert.
+
+Each case runs in a fresh interpreter over the synthetic corpus (see corpus.py).
+It reports pages/s, input MB/s, CPU time, peak RSS and the peak scratch space
+(temp dir plus partial files next to the output) sampled while it runs.
+
+    python benchmarks/throughput.py                        # all cases, print results
+    python benchmarks/throughput.py --only 'convert:*'     # glob over case names
+    python benchmarks/throughput.py --save baseline.json
+    python benchmarks/throughput.py --baseline baseline.json
+"""
+import os
+import sys
+import json
+import time
+import fnmatch
+import argparse
+import tempfile
+import threading
+import statistics
+import subprocess
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from corpus import ARCHIVE_FORMATS, generate, parse_size  # noqa: E402
+
+CREATE_FORMATS = ['cbz', 'zip', '7z', 'pdf', 'epub']
+CONVERT_FORMATS = ['cbz', '7z', 'pdf', 'epub']
+
+# Scratch space is sampled this often (short-lived spikes can be missed)
+_SAMPLE_INTERVAL = 0.005
+
+
+def all_cases(page_format):
+    cases = [f"create:{page_format}->{fmt}" for fmt in CREATE_FORMATS]
+    cases += [f"extract:{fmt}" for fmt in ARCHIVE_FORMATS]
+    cases += [f"convert:{src}->{dst}" for src in ARCHIVE_FORMATS for dst in CONVERT_FORMATS if src != dst]
+    return cases
+
+
+def tree_size(path: Path):
+    total = 0
+    for root, dirs, files in os.walk(path):
+        for f in files:
+            try:
+                total += os.path.getsize(os.path.join(root, f))
+            except OSError:
+                pass
+    return total
+
+
+def peak_rss_bytes():
+    """Peak RSS of this process and its finished children (None where unsupported)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    scale = 1 if sys.platform == 'darwin' else 1024  # ru_maxrss is in bytes on macOS, KiB elsewhere
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    try:
+        # Linux keeps ru_maxrss across exec, so it would include the parent's peak; VmHWM does not
+        with open('/proc/self/status') as f:
+            own = next(int(line.split()[1]) * 1024 for line in f if line.startswith('VmHWM:'))
+    except (OSError, StopIteration):
+        pass
+    return max(own, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale)
+
+
+def run_case(case, corpus: Path, work: Path):
+    """Run one case in this process and return its measurements."""
+    from src.core.archive_manager import ArchiveManager
+    from src.core.page_source import open_source
+    from src.modules.ebook_to_cbz.converter import convert_ebook
+
+    kind, _, spec = case.partition(':')
+    src, _, dst = spec.partition('->')
+    out_dir = work / 'out'
+    out_dir.mkdir(parents=True)
+
+    if kind == 'create':
+        source = corpus / 'folders' / src
+        action = lambda: ArchiveManager.create_archive(source, out_dir / f"book.{dst}", dst)  # noqa: E731
+    elif kind == 'extract':
+        source = corpus / 'archives' / f"book.{src}"
+        action = lambda: ArchiveManager.extract_archive(source, out_dir / 'book')  # noqa: E731
+    elif kind == 'convert':
+        source = corpus / 'archives' / f"book.{src}"
+        action = lambda: convert_ebook(source, out_dir, dst)  # noqa: E731
+    else:
+        raise ValueError(f"Unknown case: {case}")
+
+    # Scratch = everything under the temp dir and output dir beyond the final output
+    peak_total = 0
+    done = threading.Event()
+
+    def sample():
+        nonlocal peak_total
+        while not done.wait(_SAMPLE_INTERVAL):
+            peak_total = max(peak_total, tree_size(work))
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    cpu = time.process_time()
+    start = time.perf_counter()
+    try:
+        action()
+    finally:
+        seconds = time.perf_counter() - start
+        cpu = time.process_time() - cpu
+        done.set()
+        sampler.join()
+
+    bytes_out = tree_size(out_dir)
+    peak_total = max(peak_total, tree_size(work))
+    bytes_in = tree_size(source) if source.is_dir() else source.stat().st_size
+    with open_source(source) as pages:
+        page_count = len(pages)
+    return {
+        'seconds': seconds,
+        'cpu_seconds': cpu,
+        'pages': page_count,
+        'bytes_in': bytes_in,
+        'bytes_out': bytes_out,
+        'peak_rss': peak_rss_bytes(),
+        'scratch_bytes': max(0, peak_total - bytes_out),
+    }
+
+
+def measure(case, corpus, runs):
+    samples = []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory(prefix='comic-bench-') as work:
+            # The temp dir is redirected into work, so backend scratch files are counted too
+            env = {**os.environ, 'TMPDIR': work, 'TEMP': work, 'TMP': work}
+            proc = subprocess.run(
+                [sys.executable, __file__, '--run-case', case, '--corpus', str(corpus), '--work', work],
+                cwd=REPO_ROOT, capture_output=True, text=True, env=env,
+            )
+            if proc.returncode != 0:
+                raise RuntimeError((proc.stderr.strip().splitlines() or ['failed'])[-1])
+            samples.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    best = min(samples, key=lambda s: s['seconds'])
+    seconds = statistics.median(s['seconds'] for s in samples)
+    return {
+        'median_s': seconds,
+        'min_s': best['seconds'],
+        'cpu_s': statistics.median(s['cpu_seconds'] for s in samples),
+        'pages_per_s': best['pages'] / seconds if seconds else 0.0,
+        'mb_per_s': best['bytes_in'] / 1024 ** 2 / seconds if seconds else 0.0,
+        'peak_rss_mb': max((s['peak_rss'] or 0) for s in samples) / 1024 ** 2,
+        'scratch_mb': max(s['scratch_bytes'] for s in samples) / 1024 ** 2,
+        'output_mb': best['bytes_out'] / 1024 ** 2,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', type=Path, default=Path(tempfile.gettempdir()) / 'comic-utils-bench-corpus',
+                        help='corpus location (generated if missing or built with other settings)')
+    parser.add_argument('--pages', type=int, default=24, help='pages per book')
+    parser.add_argument('--size', type=parse_size, default=(1600, 2400), metavar='WxH', help='page size')
+    parser.add_argument('--page-format', choices=['jpeg', 'png', 'webp'], default='jpeg',
+                        help='page folder used by the create cases')
+    parser.add_argument('-n', '--runs', type=int, default=3, help='fresh interpreters per case')
+    parser.add_argument('--only', action='append', metavar='GLOB', help="cases to run, e.g. 'create:*'")
+    parser.add_argument('--save', type=Path, help='write results as JSON')
+    parser.add_argument('--baseline', type=Path, help='compare against a saved JSON result')
+    parser.add_argument('--run-case', help=argparse.SUPPRESS)
+    parser.add_argument('--work', type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_case:
+        # Child side: one measured run
+        print(json.dumps(run_case(args.run_case, args.corpus, args.work)))
+        return
+
+    generate(args.corpus, args.pages, args.size)
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else {}
+    results = {}
+    for case in all_cases(args.page_format):
+        if args.only and not any(fnmatch.fnmatch(case, pattern) for pattern in args.only):
+            continue
+        try:
+            results[case] = r = measure(case, args.corpus, args.runs)
+        except RuntimeError as e:
+            print(f"{case:22} failed: {e}")
+            continue
+        line = (f"{case:22} {r['median_s']:7.3f} s  {r['pages_per_s']:7.1f} pages/s  {r['mb_per_s']:7.1f} MB/s  "
+                f"cpu {r['cpu_s']:6.3f} s  rss {r['peak_rss_mb']:6.1f} MB  scratch {r['scratch_mb']:6.1f} MB")
+        if case in baseline:
+            change = (r['median_s'] / baseline[case]['median_s'] - 1) * 100
+            line += f"  {change:+6.1f}% time vs baseline"
+        print(line)
+
+    if args.save:
+        args.save.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,17 @@
 import sys
 import os
+import multiprocessing
 
 # Ensure src is in path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from src.ui.main_window import run_gui
-
 if __name__ == "__main__":
+    # Needed for worker processes in the frozen (PyInstaller) build
+    multiprocessing.freeze_support()
+    if len(sys.argv) > 1:
+        # Command line mode (pack/convert/extract); never loads Qt
+        from src.cli import main
+        sys.exit(main())
+
+    from src.ui.main_window import run_gui
     run_gui()
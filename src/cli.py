@@ -0,0 +1,331 @@
+import sys
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
+from pathlib import Path
+
+# Headless command line interface. Must never import PyQt6 (directly or through
+# src.ui), it runs on display-less workers.
+
+from src.core.compression import PRESETS, DEFAULT_PRESET
+from src.core.output_cache import OutputCache, DEFAULT_CACHE_SIZE
+from src.core.image_processing import DEVICE_PROFILES, OUTPUT_FORMATS, DEFAULT_QUALITY, EINK_LEVELS, ImageProcessor, \
+    image_pool
+from src.core.stats import BatchStats, JobStats
+from src.core.pipeline import DEFAULT_PIPELINE, PipelineConfig
+from src.core.pdf_render import COLORSPACES, DEFAULT_DPI, RENDER_FORMATS, RENDER_MODES, PdfRenderer
+
+WRITE_FORMATS = ['cbz', 'zip', 'pdf', 'epub', '7z']
+
+
+class Reporter:
+    """Prints progress either as plain text or as JSON lines on stdout."""
+
+    def __init__(self, as_json):
+        self.as_json = as_json
+
+    def emit(self, event, **fields):
+        if self.as_json:
+            print(json.dumps({'event': event, **fields}, ensure_ascii=False), flush=True)
+        elif event == 'log':
+            print(fields['message'], flush=True)
+        elif event == 'progress':
+            print(f"[{fields['current']}/{fields['total']}] {fields['message']}", flush=True)
+        elif event == 'result' and fields.get('error'):
+            print(f"Failed: {fields['source']}: {fields['error']}", file=sys.stderr, flush=True)
+        elif event == 'done':
+            print(f"Done: {fields['ok']} ok, {fields['failed']} failed", flush=True)
+
+
+def _make_cache(args):
+    # Opt-in: a lookup hashes the whole source, an extra full read on every miss
+    if not args.cache:
+        return None
+    return OutputCache(args.cache_dir, args.cache_size * 1024 ** 2)
+
+
+def _make_images(args):
+    """ImageProcessor for the resize/gray/re-encode options, or None to keep pages as they are."""
+    grayscale = args.grayscale or args.eink
+    resize = args.profile or args.max_size
+    if not (resize or grayscale or args.image_format):
+        return None
+    # Resized pages default to JPEG; gray reduction alone keeps each page's format
+    fmt = args.image_format or (None if grayscale else 'jpeg')
+    return ImageProcessor(args.profile, fmt, args.quality, size=args.max_size, grayscale=grayscale,
+                          levels=EINK_LEVELS if args.eink else None)
+
+
+def _make_stats(args, reporter):
+    """BatchStats if --stats/--stats-json was given; in JSON mode every finished job is emitted as a 'job' event."""
+    if not (args.stats or args.stats_json):
+        return None
+    return BatchStats(callback=lambda event: reporter.emit(**event))
+
+
+def _report_stats(stats, args, reporter):
+    if stats is None:
+        return
+    if args.stats_json:
+        stats.dump(args.stats_json)
+    if args.stats:
+        if reporter.as_json:
+            summary = stats.summary()
+            del summary['jobs']  # already emitted one by one
+            reporter.emit('stats', **summary)
+        else:
+            print(stats.report(), file=sys.stderr, flush=True)
+
+
+def _make_pipeline(args):
+    return PipelineConfig(args.read_ahead, args.buffer_size * 1024 ** 2)
+
+
+def _make_pdf_render(args):
+    """PdfRenderer for --render, or None to take PDF pages from their embedded images."""
+    if not args.render:
+        return None
+    return PdfRenderer(args.render, args.dpi, args.colorspace, args.render_format)
+
+
+def _size(value):
+    try:
+        width, height = (int(v) for v in value.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got {value!r}")
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError(f"size must be positive: {value!r}")
+    return width, height
+
+
+def _quality(value):
+    quality = int(value)
+    if not 1 <= quality <= 100:
+        raise argparse.ArgumentTypeError(f"quality must be between 1 and 100: {value}")
+    return quality
+
+
+def _dpi(value):
+    dpi = int(value)
+    if not 18 <= dpi <= 1200:
+        raise argparse.ArgumentTypeError(f"dpi must be between 18 and 1200: {value}")
+    return dpi
+
+
+def cmd_pack(args, reporter):
+    from src.modules.comic_folder.converter import process_directory
+
+    stats = _make_stats(args, reporter)
+    results = []
+    for root in args.inputs:
+        results.extend(process_directory(
+            root,
+            args.output,
+            formats=args.formats or ['cbz'],
+            process_archives=args.archives,
+            progress_callback=lambda current, total, message: reporter.emit(
+                'progress', current=current, total=total, message=message),
+            log_callback=lambda message: reporter.emit('log', message=message),
+            workers=args.workers,
+            compression=args.compression,
+            incremental=args.incremental,
+            cache=_make_cache(args) if args.archives else None,
+            images=_make_images(args),
+            stats=stats,
+            pipeline=_make_pipeline(args),
+        ))
+
+    _report_stats(stats, args, reporter)
+    failed = 0
+    for r in results:
+        reporter.emit('result', **r)
+        failed += r['error'] is not None
+    reporter.emit('done', ok=len(results) - failed, failed=failed)
+    return 1 if failed else 0
+
+
+def _convert_one(path, output, fmt, compression, cache, images, pipeline, pdf_render=None, threads=None, pool=None,
+                 collect_stats=False):
+    from src.modules.ebook_to_cbz.converter import convert_ebook
+    job = JobStats(str(path), enabled=collect_stats)
+    with job:
+        out = convert_ebook(Path(path), Path(output) if output else None, fmt, compression=compression, cache=cache,
+                            images=images, stats=job, pipeline=pipeline, pdf_render=pdf_render, threads=threads,
+                            pool=pool)
+    return {'output': str(out), 'stats': job.to_dict()}
+
+
+def _extract_one(path, output, pipeline, workers=None, pdf_render=None, collect_stats=False):
+    from src.core.archive_manager import ArchiveManager
+    path = Path(path)
+    out_dir = (Path(output) if output else path.parent) / path.stem
+    job = JobStats(str(path), enabled=collect_stats)
+    with job:
+        count = ArchiveManager.extract_archive(path, out_dir, stats=job, pipeline=pipeline, workers=workers,
+                                               pdf_render=pdf_render)
+    if count == 0:
+        raise ValueError("No images extracted")
+    return {'output': str(out_dir), 'images': count, 'stats': job.to_dict()}
+
+
+def _run_batch(func, jobs, inputs, reporter, stats=None, **kwargs):
+    """
+    Run func(path, **kwargs) for every input, on a process pool if jobs > 1.
+    func returns a result dict whose 'stats' entry (a JobStats dict) goes to stats, a BatchStats.
+    """
+    total = len(inputs)
+    done = 0
+    failed = 0
+    kwargs['collect_stats'] = stats is not None
+
+    def report(path, result=None, error=None):
+        nonlocal done, failed
+        done += 1
+        failed += error is not None
+        job = (result or {}).pop('stats', None)
+        if stats:
+            # A failed job's stages are lost with its exception; it is still counted
+            stats.add(job or {'name': str(path), 'wall': 0.0, 'cpu': 0.0, 'error': str(error), 'stages': {}})
+        reporter.emit('result', source=str(path), error=str(error) if error is not None else None, **(result or {}))
+        reporter.emit('progress', current=done, total=total, message=f"{'Failed' if error else 'Done'}: {Path(path).name}")
+
+    if jobs > 1 and total > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, total)) as pool:
+            futures = {pool.submit(func, path, **kwargs): path for path in inputs}
+            for future in as_completed(futures):
+                try:
+                    report(futures[future], future.result())
+                except Exception as e:
+                    report(futures[future], error=e)
+    else:
+        for path in inputs:
+            try:
+                report(path, func(path, **kwargs))
+            except Exception as e:
+                report(path, error=e)
+
+    reporter.emit('done', ok=done - failed, failed=failed)
+    return 1 if failed else 0
+
+
+def cmd_convert(args, reporter):
+    stats = _make_stats(args, reporter)
+    images = _make_images(args)
+    # Files converted in parallel already keep every core busy, each one works on a single
+    # process; one after the other, they share a single image pool
+    parallel = args.jobs > 1 and len(args.inputs) > 1
+    with image_pool() if images and not parallel else nullcontext() as pool:
+        code = _run_batch(_convert_one, args.jobs, args.inputs, reporter, stats=stats,
+                          output=args.output, fmt=args.format, compression=args.compression, cache=_make_cache(args),
+                          images=images, pipeline=_make_pipeline(args), pdf_render=_make_pdf_render(args),
+                          threads=1 if parallel else None, pool=pool)
+    _report_stats(stats, args, reporter)
+    return code
+
+
+def cmd_extract(args, reporter):
+    stats = _make_stats(args, reporter)
+    # With files extracted in parallel, each one gets a single process for its PDF pages
+    workers = 1 if args.jobs > 1 and len(args.inputs) > 1 else None
+    code = _run_batch(_extract_one, args.jobs, args.inputs, reporter, stats=stats, output=args.output,
+                      pipeline=_make_pipeline(args), workers=workers, pdf_render=_make_pdf_render(args))
+    _report_stats(stats, args, reporter)
+    return code
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='comic-utils', description='Pack, convert and extract comic archives.')
+    parser.add_argument('--json', action='store_true', help='print progress as JSON lines on stdout')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    def add_cache_args(p):
+        p.add_argument('--cache', action='store_true',
+                       help='reuse earlier conversions of the same content (each source is hashed in full)')
+        p.add_argument('--cache-dir', type=Path, help='cache location (default: per-user cache dir)')
+        p.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE // 1024 ** 2, metavar='MB',
+                       help='cache size budget in MB')
+
+    def add_image_args(p):
+        g = p.add_argument_group('page processing (lossy, off by default)')
+        size = g.add_mutually_exclusive_group()
+        size.add_argument('--profile', choices=list(DEVICE_PROFILES), help='fit pages to this device screen')
+        size.add_argument('--max-size', type=_size, metavar='WxH', help='fit pages into WIDTHxHEIGHT pixels')
+        g.add_argument('--image-format', choices=list(OUTPUT_FORMATS),
+                       help='re-encode pages as (default: jpeg when resizing, else keep)')
+        g.add_argument('--grayscale', action='store_true', help='store pages that look gray as 8-bit grayscale')
+        g.add_argument('--eink', action='store_true',
+                       help=f'--grayscale and reduce gray pages to {EINK_LEVELS} levels (4-bit PNG)')
+        g.add_argument('--quality', type=_quality, default=DEFAULT_QUALITY, help='JPEG/WebP quality, 1-100')
+
+    def add_pipeline_args(p):
+        g = p.add_argument_group('pipeline')
+        g.add_argument('--read-ahead', type=int, default=DEFAULT_PIPELINE.depth, metavar='PAGES',
+                       help='pages read ahead of compression/writing on a reader thread (0: off)')
+        g.add_argument('--buffer-size', type=int, default=DEFAULT_PIPELINE.buffer_size // 1024 ** 2, metavar='MB',
+                       help='most page data held by the read-ahead')
+
+    def add_pdf_args(p):
+        g = p.add_argument_group('PDF pages')
+        g.add_argument('--render', choices=RENDER_MODES,
+                       help='render PDF pages instead of taking their images: auto (pages that are not one '
+                            'full-page image, e.g. strips or vector content) or all')
+        g.add_argument('--dpi', type=_dpi, default=DEFAULT_DPI, help='resolution of rendered pages')
+        g.add_argument('--colorspace', choices=COLORSPACES, default='rgb', help='colorspace of rendered pages')
+        g.add_argument('--render-format', choices=list(RENDER_FORMATS), default='png',
+                       help='image format of rendered pages')
+
+    def add_stats_args(p):
+        p.add_argument('--stats', action='store_true',
+                       help='print time, CPU and bytes per stage (open, read, process, compress, write, ...) at the end')
+        p.add_argument('--stats-json', type=Path, metavar='PATH', help='write the per-stage and per-job stats as JSON')
+
+    p = sub.add_parser('pack', help='pack image folders (and optionally archives) found under directories')
+    p.add_argument('inputs', nargs='+', help='root directories')
+    p.add_argument('-o', '--output', help='output directory (default: next to each source)')
+    p.add_argument('-f', '--format', dest='formats', action='append', choices=WRITE_FORMATS,
+                   help='target format, may be repeated (default: cbz)')
+    p.add_argument('--archives', action='store_true', help='also convert archives found in the tree')
+    p.add_argument('-w', '--workers', type=int, default=1, help='worker processes')
+    p.add_argument('--compression', choices=list(PRESETS), default=DEFAULT_PRESET)
+    p.add_argument('--incremental', action='store_true', help='skip sources whose outputs are up to date')
+    add_cache_args(p)
+    add_image_args(p)
+    add_pipeline_args(p)
+    add_stats_args(p)
+    p.set_defaults(func=cmd_pack)
+
+    p = sub.add_parser('convert', help='convert archives/ebooks to another format')
+    p.add_argument('inputs', nargs='+', help='input files')
+    p.add_argument('-o', '--output', help='output directory (default: next to each input)')
+    p.add_argument('-f', '--format', choices=WRITE_FORMATS, default='cbz')
+    p.add_argument('-j', '--jobs', type=int, default=1, help='files converted in parallel')
+    p.add_argument('--compression', choices=list(PRESETS), default=DEFAULT_PRESET)
+    add_cache_args(p)
+    add_image_args(p)
+    add_pdf_args(p)
+    add_pipeline_args(p)
+    add_stats_args(p)
+    p.set_defaults(func=cmd_convert)
+
+    p = sub.add_parser('extract', help='extract the images of archives/ebooks into folders')
+    p.add_argument('inputs', nargs='+', help='input files')
+    p.add_argument('-o', '--output', help='output directory, one subfolder per input (default: next to each input)')
+    p.add_argument('-j', '--jobs', type=int, default=1, help='files extracted in parallel')
+    add_pdf_args(p)
+    add_pipeline_args(p)
+    add_stats_args(p)
+    p.set_defaults(func=cmd_extract)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args, Reporter(args.json))
+
+
+if __name__ == '__main__':
+    import multiprocessing
+    multiprocessing.freeze_support()
+    sys.exit(main())
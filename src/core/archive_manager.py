@@ -1,12 +1,26 @@
 import os
+import time
 import shutil
 import zipfile
+import zlib
 import tempfile
+import itertools
+import threading
+from contextlib import closing, contextmanager
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from PIL import Image
-import img2pdf
-import py7zr
-import fitz  # pymupdf
+
+from src.core.compression import CompressionPolicy, DEFAULT_PRESET
+from src.core.image_processing import ImageProcessor
+from src.core.pdf_extract import extract_pdf_images
+from src.core.pdf_render import PdfRenderer
+from src.core.pdf_writer import PdfWriter
+from src.core.page_source import FolderSource, ZipSource, open_source, timed_pages
+from src.core.pipeline import Cancelled, PipelineConfig, check_cancel, fan_out, read_ahead
+from src.core.stats import NO_STATS, JobStats
+from src.core.utils import candidate_names
+from src.core.zip_raw import deflate_member, iter_raw_member, write_raw_member
 
 # Common
 IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp'}
@@ -14,80 +28,421 @@ IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp'}
 def is_image_file(filename):
     return Path(filename).suffix.lower() in IMAGE_EXTENSIONS
 
-def natural_sort_key(value: str):
-    import re
-    if isinstance(value, Path):
-        value = value.name
-    parts = re.split(r'(\d+)', value)
-    return [int(p) if p.isdigit() else p.lower() for p in parts]
+# A run of pages wanting another 7z filter chain than the open folder's gets a folder
+# of its own from this many bytes on; shorter runs (a PNG among JPEGs) join the open one
+_MIN_FOLDER_RUN = 8 * 1024 ** 2
+
+# Format backends (py7zr, PyMuPDF, Pillow, rarfile, patool) are imported
+# on first use, so startup and CBZ-only work never pay for loading them.
 
 class ArchiveManager:
     """Handles creation and extraction of various archive formats."""
     
     @staticmethod
-    def create_archive(source_dir: Path, output_path: Path, fmt: str):
+    def create_archive(source_dir: Path, output_path: Path, fmt: str, threads: int | None = None,
+                       compression: str = DEFAULT_PRESET, images: ImageProcessor | None = None,
+                       stats: JobStats | None = None, pipeline: PipelineConfig | None = None,
+                       pool: ProcessPoolExecutor | None = None, cancel: threading.Event | None = None):
         """
         Create an archive from a directory of images.
         fmt: 'cbz', 'zip', 'pdf', 'epub', '7z', 'mobi'
+        threads: compression threads for zip/cbz and image processes (default: one per CPU)
+        compression: 'fast', 'balanced' or 'max' entry compression for zip/cbz/epub
+        images: optional ImageProcessor that resizes/re-encodes pages before writing
+        stats: optional JobStats that records time and bytes per stage
+        pipeline: read-ahead limits (see pipeline)
+        pool: the batch's image process pool (see image_processing.image_pool)
+        cancel: optional Event; once set, writing stops with pipeline.Cancelled
         """
+        return ArchiveManager._raise_failed(ArchiveManager.create_archives(
+            source_dir, {fmt: output_path}, threads, compression, images, stats, pipeline, pool, cancel))[fmt]
+
+    @staticmethod
+    def create_archives(source_dir: Path, outputs: dict, threads: int | None = None,
+                        compression: str = DEFAULT_PRESET, images: ImageProcessor | None = None,
+                        stats: JobStats | None = None, pipeline: PipelineConfig | None = None,
+                        pool: ProcessPoolExecutor | None = None, cancel: threading.Event | None = None):
+        """
+        Create archives in several formats from one read of a directory of images.
+        outputs: {fmt: output_path}. Every page is read (and processed) once and
+        handed to all the writers at the same time (see write_formats).
+        Returns {fmt: pages written}, with the exception instead for a format that failed.
+        Other arguments as for create_archive.
+        """
+        stats = stats or NO_STATS
         if not source_dir.exists():
             raise FileNotFoundError(f"{source_dir} not found")
 
-        # Gather images
-        images = [f for f in os.listdir(source_dir) if is_image_file(f)]
-        images.sort(key=natural_sort_key)
-        
-        if not images:
-            raise ValueError("No images found in folder")
+        with stats.stage('open'):
+            source = FolderSource(source_dir)
+        with source:
+            if not len(source):
+                raise ValueError("No images found in folder")
+            with closing(read_ahead(timed_pages(source, stats), pipeline)) as pages:
+                if images:
+                    pages = images.pages(pages, threads, stats, pool)
+                return ArchiveManager.write_formats(pages, outputs, title=source_dir.name, threads=threads,
+                                                    compression=compression, stats=stats, pipeline=pipeline,
+                                                    cancel=cancel)
+
+    @staticmethod
+    def convert_archive(input_path: Path, output_path: Path, fmt: str, threads: int | None = None,
+                        compression: str = DEFAULT_PRESET, images: ImageProcessor | None = None,
+                        stats: JobStats | None = None, pipeline: PipelineConfig | None = None,
+                        pdf_render: PdfRenderer | None = None, pool: ProcessPoolExecutor | None = None,
+                        cancel: threading.Event | None = None):
+        """
+        Convert an archive/ebook straight into another format without extracting it to disk.
+        Returns the number of pages written (0 means no images were found and nothing was written).
+        images: optional ImageProcessor that resizes/re-encodes pages before writing
+        stats: optional JobStats that records time and bytes per stage
+        pipeline: read-ahead limits (see pipeline)
+        pdf_render: optional PdfRenderer; PDF pages it picks are rendered (on threads processes)
+        pool: the batch's image process pool (see image_processing.image_pool)
+        cancel: optional Event; once set, writing stops with pipeline.Cancelled
+        """
+        return ArchiveManager._raise_failed(ArchiveManager.convert_archives(
+            input_path, {fmt: output_path}, threads, compression, images, stats, pipeline, pdf_render, pool,
+            cancel))[fmt]
+
+    @staticmethod
+    def convert_archives(input_path: Path, outputs: dict, threads: int | None = None,
+                         compression: str = DEFAULT_PRESET, images: ImageProcessor | None = None,
+                         stats: JobStats | None = None, pipeline: PipelineConfig | None = None,
+                         pdf_render: PdfRenderer | None = None, pool: ProcessPoolExecutor | None = None,
+                         cancel: threading.Event | None = None):
+        """
+        Convert an archive/ebook into several formats, decoding it once.
+        outputs: {fmt: output_path}. Returns {fmt: pages written}, with the exception
+        instead for a format that failed. Other arguments as for convert_archive.
+        """
+        stats = stats or NO_STATS
+        results = {}
+        outputs = dict(outputs)
+        with stats.stage('open'):
+            source = open_source(input_path, pdf_render, threads)
+        with source:
+            if not images and isinstance(source, ZipSource):
+                # ZIP -> ZIP: copy the compressed members as they are (keeps the source compression)
+                for fmt in [fmt for fmt in outputs if fmt.lower() in ['cbz', 'zip']]:
+                    output_path = outputs.pop(fmt)
+                    try:
+                        with stats.stage('copy') as copied:
+                            results[fmt] = count = ArchiveManager._repack_zip(source, output_path, cancel)
+                            if count:
+                                copied.add(bytes_in=sum(info.compress_size for _, info in source.members),
+                                           bytes_out=os.path.getsize(output_path))
+                    except Exception as e:
+                        results[fmt] = e
+            if not outputs:
+                return results
+
+            with closing(read_ahead(timed_pages(source, stats), pipeline)) as pages:
+                if images:
+                    pages = images.pages(pages, threads, stats, pool)
+                results.update(ArchiveManager.write_formats(pages, outputs, title=input_path.stem, threads=threads,
+                                                            compression=compression, stats=stats, pipeline=pipeline,
+                                                            cancel=cancel))
+        return results
+
+    @staticmethod
+    def _raise_failed(results):
+        """results of create_archives/convert_archives, with the first failure raised."""
+        for result in results.values():
+            if isinstance(result, BaseException):
+                raise result
+        return results
+
+    @staticmethod
+    def count_pages(input_path: Path):
+        """
+        Number of pages in a folder, archive or ebook, taken from its index
+        without decoding any image.
+        """
+        with open_source(input_path) as source:
+            return len(source)
+
+    @staticmethod
+    def write_pages(pages, output_path: Path, fmt: str, title: str = "Comic", threads: int | None = None,
+                    compression: str = DEFAULT_PRESET, stats: JobStats | None = None,
+                    cancel: threading.Event | None = None):
+        """
+        Write an iterable of Page records (see page_source), already in reading order,
+        to an archive. Each page is read only when it is written. Returns the number of pages written;
+        if there are no pages the output file is not created.
+        fmt: 'cbz', 'zip', 'pdf', 'epub', '7z', 'mobi', 'rar'
+        threads: compression threads for zip/cbz (default: one per CPU)
+        compression: 'fast', 'balanced' or 'max' entry compression for zip/cbz/epub/7z
+        stats: optional JobStats; records 'compress' and 'write' (everything else)
+        cancel: optional Event, checked before every page; once set, pipeline.Cancelled
+        is raised and no output is left behind
+        """
+        stats = stats or NO_STATS
+        with stats.stage('write') as written:
+            count = ArchiveManager._write_pages(pages, output_path, fmt, title, threads, compression, stats, cancel)
+            if count:
+                written.add(bytes_out=os.path.getsize(output_path))
+        return count
 
+    @staticmethod
+    def write_formats(pages, outputs: dict, title: str = "Comic", threads: int | None = None,
+                      compression: str = DEFAULT_PRESET, stats: JobStats | None = None,
+                      pipeline: PipelineConfig | None = None, cancel: threading.Event | None = None):
+        """
+        Write one iterable of Page records to several archives at once; outputs: {fmt: output_path}.
+        Each page is read once; with more than one output every writer runs on its
+        own thread, fed through a queue of pipeline.depth pages (see pipeline.fan_out).
+        Returns {fmt: pages written}, with the exception instead for a format that failed.
+        Other arguments as for write_pages.
+        """
+        writers = [
+            lambda pages, fmt=fmt, output_path=output_path: ArchiveManager.write_pages(
+                pages, output_path, fmt, title=title, threads=threads, compression=compression, stats=stats,
+                cancel=cancel)
+            for fmt, output_path in outputs.items()
+        ]
+        if len(writers) == 1:
+            try:
+                results = [writers[0](pages)]
+            except Exception as e:
+                results = [e]
+        else:
+            results = fan_out(pages, writers, pipeline)
+        return dict(zip(outputs, results))
+
+    @staticmethod
+    def _write_pages(pages, output_path, fmt, title, threads, compression, stats, cancel):
         fmt = fmt.lower()
-        if fmt in ['cbz', 'zip']:
-            with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as zf:
-                for img in images:
-                    zf.write(source_dir / img, arcname=img)
+        if threads is None:
+            threads = os.cpu_count() or 1
+        policy = CompressionPolicy(compression)
+        if fmt not in ['cbz', 'zip', '7z', 'pdf', 'epub', 'mobi', 'rar']:
+            raise ValueError(f"Unsupported write format: {fmt}")
+
+        # Peek so an empty source never leaves an empty archive behind
+        pages = iter(pages)
+        first = next(pages, None)
+        if first is None:
+            return 0
+
+        count = 0
+
+        def counted():
+            nonlocal count
+            for page in itertools.chain([first], pages):
+                check_cancel(cancel)
+                count += 1
+                yield page.name, page.read()
+
+        # Written under a temporary name and renamed when complete, so a failed run
+        # never leaves a truncated file and an existing output is replaced, not rewritten
+        with ArchiveManager._atomic_output(output_path) as part_path:
+            if fmt in ['cbz', 'zip']:
+                with zipfile.ZipFile(part_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+                    ArchiveManager._write_zip_pages(zf, counted(), threads, policy, stats)
                     
-        elif fmt == '7z':
-            with py7zr.SevenZipFile(output_path, 'w') as zf:
-                for img in images:
-                    zf.write(source_dir / img, arcname=img)
+            elif fmt == '7z':
+                ArchiveManager._write_7z_pages(part_path, counted(), policy, stats)
                     
-        elif fmt == 'pdf':
-            # Convert images to PDF bytes
-            img_paths = [str(source_dir / img) for img in images]
-            with open(output_path, "wb") as f:
-                f.write(img2pdf.convert(img_paths))
+            elif fmt == 'pdf':
+                # Pages are appended to the file as they come, memory stays at about one page
+                with open(part_path, "wb") as f, PdfWriter(f) as pdf:
+                    for name, data in counted():
+                        pdf.add_page(data)
                 
-        elif fmt == 'epub':
-            # Simple EPUB creation (container + manifest)
-            ArchiveManager._create_simple_epub(source_dir, images, output_path)
+            elif fmt == 'epub':
+                # Simple EPUB creation (container + manifest)
+                ArchiveManager._create_simple_epub(counted(), part_path, title, policy)
             
-        elif fmt == 'mobi':
-             # MOBI creation via EPUB
-             # Real MOBI creation is not natively supported in Python without external tools like kindlegen.
-             # We will create an EPUB and warn the user, or rename it if they insist on the extension.
-             # Current strategy: Create EPUB structure but save with .mobi extension and log warning.
-             # This allows the file to exist, but it's technically an EPUB.
-             # Some converters might handle it, or user can convert later.
-             ArchiveManager._create_simple_epub(source_dir, images, output_path)
-             # We should probably warn the user in the log (handled by caller)
+            elif fmt == 'mobi':
+                 # MOBI creation via EPUB
+                 # Real MOBI creation is not natively supported in Python without external tools like kindlegen.
+                 # We will create an EPUB and warn the user, or rename it if they insist on the extension.
+                 # Current strategy: Create EPUB structure but save with .mobi extension and log warning.
+                 # This allows the file to exist, but it's technically an EPUB.
+                 # Some converters might handle it, or user can convert later.
+                 ArchiveManager._create_simple_epub(counted(), part_path, title, policy)
+                 # We should probably warn the user in the log (handled by caller)
              
-        elif fmt == 'rar':
-            # Use patool to create RAR (requires rar/WinRAR executable)
-            # patoolib.create_archive(archive, filenames)
-            try:
-                # patool expects list of files, but we want to archive the directory content or the directory itself?
-                # Usually we want the images inside.
-                # patool creates an archive containing the files.
-                file_paths = [str(source_dir / img) for img in images]
-                patoolib.create_archive(str(output_path), file_paths, verbosity=-1)
-            except Exception as e:
-                raise RuntimeError(f"RAR creation failed (ensure WinRAR/rar is in PATH): {e}")
+            elif fmt == 'rar':
+                # Use patool to create RAR (requires rar/WinRAR executable)
+                # patool only archives files on disk, so spill the pages to a temp dir first
+                try:
+                    import patoolib
+                    with tempfile.TemporaryDirectory() as temp_dir:
+                        file_paths = []
+                        for name, data in counted():
+                            page_path = Path(temp_dir) / name
+                            page_path.write_bytes(data)
+                            file_paths.append(str(page_path))
+                        patoolib.create_archive(str(part_path), file_paths, verbosity=-1)
+                except Exception as e:
+                    raise RuntimeError(f"RAR creation failed (ensure WinRAR/rar is in PATH): {e}")
 
-        else:
-            raise ValueError(f"Unsupported write format: {fmt}")
+        return count
+
+    @staticmethod
+    def _repack_zip(source: ZipSource, output_path: Path, cancel: threading.Event | None = None):
+        """
+        Copy the image members of a zip/cbz/epub into a new zip byte-for-byte
+        (same compressed data and CRC), so nothing is inflated or deflated.
+        """
+        if not source.members:
+            return 0
+
+        with ArchiveManager._atomic_output(output_path) as part_path, open(source.path, 'rb') as src, \
+                zipfile.ZipFile(part_path, 'w', zipfile.ZIP_DEFLATED) as zout:
+            for name, info in source.members:
+                check_cancel(cancel)
+                zinfo = zipfile.ZipInfo(name, date_time=info.date_time)
+                zinfo.compress_type = info.compress_type
+                zinfo.flag_bits = info.flag_bits
+                zinfo.create_system = info.create_system
+                zinfo.external_attr = info.external_attr
+                zinfo.CRC = info.CRC
+                zinfo.compress_size = info.compress_size
+                zinfo.file_size = info.file_size
+                write_raw_member(zout, zinfo, iter_raw_member(src, info))
+        return len(source.members)
 
     @staticmethod
-    def _create_simple_epub(source_dir, images, output_path):
+    @contextmanager
+    def _atomic_output(output_path: Path):
+        """
+        Yield a temporary path next to output_path; it replaces output_path on
+        success and is removed on failure.
+        """
+        output_path = Path(output_path)
+        # Keep the suffix, some backends (patool) pick the format from it
+        part_path = output_path.with_name(
+            f".{output_path.stem}.{os.getpid()}-{threading.get_ident()}.part{output_path.suffix}")
+        try:
+            yield part_path
+            os.replace(part_path, output_path)
+        finally:
+            if part_path.exists():
+                part_path.unlink()
+
+    @staticmethod
+    def _write_7z_pages(path, pages, policy, stats=NO_STATS):
+        """
+        Write pages to a new 7z in page order, each with the filter chain the policy picks
+        (COPY for pages not worth compressing, LZMA2 otherwise). py7zr uses one filter chain
+        per write session (folder) and reopening the archive costs more the bigger it gets,
+        so a run of pages wanting another chain is held back: from _MIN_FOLDER_RUN bytes on
+        it starts a folder of its own, a shorter run is written into the open folder.
+        A folder is also started when a compressed one reaches block_size.
+        """
+        import py7zr
+        zf = None
+        filters = None
+        block = 0
+        run = []  # [(name, data)] after the open folder that want run_filters
+        run_filters = None
+        run_size = 0
+
+        def open_session(page_filters):
+            nonlocal zf, filters, block
+            mode = 'w' if zf is None else 'a'
+            if zf is not None:
+                zf.close()
+            zf = py7zr.SevenZipFile(path, mode, filters=page_filters)
+            filters = page_filters
+            block = 0
+
+        def write(name, data):
+            nonlocal block
+            if filters[0]['id'] != py7zr.FILTER_COPY and block >= policy.block_size:
+                open_session(filters)
+            zf.writestr(data, name)
+            block += len(data)
+
+        def write_run(own_folder):
+            nonlocal run, run_filters, run_size
+            if own_folder:
+                open_session(run_filters)
+            for name, data in run:
+                write(name, data)
+            run, run_filters, run_size = [], None, 0
+
+        try:
+            for name, data in pages:
+                with stats.stage('compress') as compressed:
+                    page_filters = policy.sevenzip_filters(name, data)
+                    if zf is None:
+                        open_session(page_filters)
+                    if run and page_filters != run_filters:
+                        # The run ended short
+                        write_run(False)
+                    if page_filters == filters:
+                        write(name, data)
+                    else:
+                        run.append((name, data))
+                        run_filters = page_filters
+                        run_size += len(data)
+                        if run_size >= _MIN_FOLDER_RUN:
+                            write_run(True)
+                    compressed.add(bytes_in=len(data))
+            if run:
+                with stats.stage('compress'):
+                    write_run(False)
+        finally:
+            if zf is not None:
+                zf.close()
+
+    @staticmethod
+    def _write_zip_pages(zf, pages, threads, policy, stats=NO_STATS):
+        """
+        Add pages to an open ZipFile, each stored or deflated as the policy decides.
+        With more than one thread, pages are compressed on a thread pool (zlib
+        releases the GIL) and appended in their original order, so the archive
+        is byte-identical to the serial path.
+        """
+        if threads <= 1:
+            for name, data in pages:
+                with stats.stage('compress') as compressed:
+                    compress_type, level = policy.choose(name, data)
+                    zinfo = ArchiveManager._zip_info(name)
+                    zf.writestr(zinfo, data, compress_type=compress_type, compresslevel=level)
+                    compressed.add(bytes_in=len(data), bytes_out=zinfo.compress_size)
+            return
+
+        def compress(name, data):
+            with stats.stage('compress') as compressed:
+                compress_type, level = policy.choose(name, data)
+                if compress_type == zipfile.ZIP_STORED:
+                    result = compress_type, zlib.crc32(data), data
+                else:
+                    result = (compress_type,) + deflate_member(data, level)
+                compressed.add(bytes_in=len(data), bytes_out=len(result[2]))
+            return result
+
+        def append(zinfo, size, future):
+            zinfo.compress_type, zinfo.CRC, payload = future.result()
+            zinfo.file_size = size
+            zinfo.compress_size = len(payload)
+            write_raw_member(zf, zinfo, [payload])
+
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            # Bounded window so only a few pages are held in memory at once
+            pending = deque()
+            for name, data in pages:
+                pending.append((ArchiveManager._zip_info(name), len(data), pool.submit(compress, name, data)))
+                if len(pending) >= threads * 2:
+                    append(*pending.popleft())
+            while pending:
+                append(*pending.popleft())
+
+    @staticmethod
+    def _zip_info(name):
+        """ZipInfo for a page written from memory (regular file, current time)."""
+        zinfo = zipfile.ZipInfo(name, date_time=time.localtime(time.time())[:6])
+        zinfo.compress_type = zipfile.ZIP_DEFLATED
+        zinfo.external_attr = 0o644 << 16
+        return zinfo
+
+    @staticmethod
+    def _create_simple_epub(pages, output_path, title, policy):
         """Create a valid (but simple) EPUB 2.0/3.0 structure."""
         with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as zf:
             # mimetype (must be uncompressed and first)
@@ -106,15 +461,17 @@ class ArchiveManager:
             manifest_items = []
             spine_refs = []
             
-            for i, img in enumerate(images):
-                img_path = source_dir / img
-                ext = img_path.suffix.lower()
+            for i, (img, data) in enumerate(pages):
+                ext = Path(img).suffix.lower()
                 mime = "image/jpeg"
                 if ext == '.png': mime = "image/png"
                 elif ext == '.gif': mime = "image/gif"
+                elif ext == '.webp': mime = "image/webp"
                 
                 # Copy image
-                zf.write(img_path, arcname=f"OEBPS/images/{img}")
+                compress_type, level = policy.choose(img, data)
+                zf.writestr(ArchiveManager._zip_info(f"OEBPS/images/{img}"), data,
+                            compress_type=compress_type, compresslevel=level)
                 
                 # Create XHTML page for image
                 page_content = f"""<?xml version="1.0" encoding="UTF-8"?>
@@ -134,7 +491,7 @@ class ArchiveManager:
             opf = f"""<?xml version="1.0" encoding="utf-8"?>
 <package xmlns="http://www.idpf.org/2007/opf" unique-identifier="uid" version="2.0">
   <metadata xmlns:dc="http://purl.org/dc/elements/1.1/">
-    <dc:title>{source_dir.name}</dc:title>
+    <dc:title>{title}</dc:title>
     <dc:language>en</dc:language>
   </metadata>
   <manifest>
@@ -157,80 +514,132 @@ class ArchiveManager:
             zf.writestr("OEBPS/toc.ncx", ncx)
 
     @staticmethod
-    def extract_archive(input_path: Path, output_dir: Path):
+    def extract_archive(input_path: Path, output_dir: Path, stats: JobStats | None = None,
+                        pipeline: PipelineConfig | None = None, workers: int | None = None,
+                        pdf_render: PdfRenderer | None = None, cancel: threading.Event | None = None):
         """
         Extract images from an archive to a folder.
-        Supports: zip, cbz, epub, mobi, 7z, rar, pdf
+        Supports: zip, cbz, epub, mobi/azw3, 7z, rar, pdf
+        stats: optional JobStats; records 'extract' and 'move'
+        pipeline: read-ahead limits for zip/cbz/epub, 7z and pdf (see pipeline)
+        workers: processes for big PDFs (default: one per CPU, see pdf_extract)
+        pdf_render: optional PdfRenderer; PDF pages it picks are rendered whole
+        cancel: optional Event, checked before every page; once set, pipeline.Cancelled
+        is raised and nothing is moved into output_dir
         """
+        stats = stats or NO_STATS
         ext = input_path.suffix.lower()
         
-        # Temp dir to hold extraction before filtering images
-        with tempfile.TemporaryDirectory() as temp_dir:
+        # Other extractions may be creating the same folder right now
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        # Temp dir to hold extraction before filtering images.
+        # Archive indexes are listed first and only image members are decompressed.
+        # It lives inside output_dir so finished files can be renamed into place.
+        with tempfile.TemporaryDirectory(dir=output_dir, prefix='.extract-') as temp_dir:
             temp_path = Path(temp_dir)
-            
-            if ext in ['.zip', '.cbz', '.epub']:
-                with zipfile.ZipFile(input_path, 'r') as zf:
-                    zf.extractall(temp_path)
-            
-            elif ext in ['.7z', '.cb7']:
-                with py7zr.SevenZipFile(input_path, mode='r') as zf:
-                    zf.extractall(temp_path)
-                    
-            elif ext == '.mobi':
-                # Use mobi lib to extract
-                import mobi
-                extracted_temp, _ = mobi.extract(str(input_path))
-                # Move content to our temp_path
-                shutil.copytree(extracted_temp, temp_path, dirs_exist_ok=True)
-                # Cleanup mobi temp
-                shutil.rmtree(extracted_temp, ignore_errors=True)
-
-            elif ext in ['.rar', '.cbr']:
-                # Requires unrar
-                try:
-                    import rarfile
-                    with rarfile.RarFile(input_path) as rf:
-                        rf.extractall(temp_path)
-                except Exception as e:
-                    raise RuntimeError(f"RAR extraction failed (ensure unrar/UnRAR.dll is installed): {e}")
-                    
-            elif ext == '.pdf':
-                # Extract images using PyMuPDF (fitz)
-                try:
-                    doc = fitz.open(input_path)
-                    for i in range(len(doc)):
-                        page = doc[i]
-                        images = page.get_images(full=True)
-                        for img_index, img in enumerate(images):
-                            xref = img[0]
-                            base_image = doc.extract_image(xref)
-                            image_bytes = base_image["image"]
-                            image_ext = base_image["ext"]
-                            image_filename = f"page{i+1:04d}_img{img_index+1:02d}.{image_ext}"
-                            with open(temp_path / image_filename, "wb") as f:
-                                f.write(image_bytes)
-                    doc.close()
-                except Exception as e:
-                    raise RuntimeError(f"PDF extraction failed: {e}")
-                
-            else:
-                raise ValueError(f"Unsupported format: {ext}")
-                
-            # Now move images from temp_path to output_dir
-            if not output_dir.exists():
-                output_dir.mkdir(parents=True)
-                
-            image_count = 0
-            for root, dirs, files in os.walk(temp_path):
-                for f in files:
-                    if is_image_file(f):
-                        # Move
-                        src = Path(root) / f
-                        dst = output_dir / f
-                        # Handle duplicate names?
-                        if dst.exists():
-                            dst = output_dir / f"{Path(root).name}_{f}"
-                        shutil.copy2(src, dst)
-                        image_count += 1
-                        
-            return image_count
+
+            with stats.stage('extract') as extracted:
+                extracted.add(bytes_in=os.path.getsize(input_path))
+                if ext in ['.zip', '.cbz', '.epub', '.7z', '.cb7', '.mobi', '.azw3', '.azw']:
+                    # Pages are read (decompressed) ahead on the reader thread while this one
+                    # writes them out, under their flattened page names
+                    with open_source(input_path) as source:
+                        with closing(read_ahead(source, pipeline)) as pages:
+                            for page in pages:
+                                check_cancel(cancel)
+                                (temp_path / page.name).write_bytes(page.read())
+
+                elif ext == '.pdf':
+                    # Images shared by several pages are written once; big PDFs are
+                    # split into page ranges extracted by separate processes
+                    extract_pdf_images(input_path, temp_path, workers=workers, pipeline=pipeline, render=pdf_render,
+                                       cancel=cancel)
+
+                elif ext in ['.rar', '.cbr']:
+                    # Requires unrar
+                    try:
+                        import rarfile
+                        with rarfile.RarFile(input_path) as rf:
+                            members = [i for i in rf.infolist() if not i.is_dir() and is_image_file(i.filename)]
+                            for member in members:
+                                check_cancel(cancel)
+                                rf.extract(member, temp_path)
+                    except Cancelled:
+                        raise
+                    except Exception as e:
+                        raise RuntimeError(f"RAR extraction failed (ensure unrar/UnRAR.dll is installed): {e}")
+
+                else:
+                    raise ValueError(f"Unsupported format: {ext}")
+
+                if stats.enabled:
+                    extracted.add(bytes_out=sum(os.path.getsize(os.path.join(root, f))
+                                                for root, dirs, files in os.walk(temp_path) for f in files))
+
+            with stats.stage('move'):
+                return ArchiveManager._move_images(temp_path, output_dir, input_path.stem)
+
+    @staticmethod
+    def _move_images(source_root: Path, output_dir: Path, root_name: str):
+        """
+        Move extracted images from source_root into output_dir, flattening folders.
+        Clashing names get their folder name (root_name at the top level) as prefix.
+        Files are hardlinked into place when both sides are on the same filesystem and
+        only copied otherwise; either way an existing file is never overwritten, even one
+        written by another extraction into the same folder meanwhile. Returns the number
+        of images moved.
+        """
+        # Names known to be taken, so most collisions are resolved without a syscall.
+        # The listing goes stale while other extractions write here, so every name is
+        # still claimed atomically (see _claim) and the next one tried if it's gone.
+        taken = set(os.listdir(output_dir))
+        link = os.stat(source_root).st_dev == os.stat(output_dir).st_dev
+
+        image_count = 0
+        for root, dirs, files in os.walk(source_root):
+            for f in files:
+                if not is_image_file(f):
+                    continue
+                src = Path(root) / f
+                parent = root_name if Path(root) == source_root else Path(root).name
+                for name in candidate_names(f, parent):
+                    if name in taken:
+                        continue
+                    taken.add(name)
+                    placed, link = ArchiveManager._claim(src, output_dir / name, link)
+                    if placed:
+                        break
+                image_count += 1
+
+        return image_count
+
+    @staticmethod
+    def _claim(src: Path, dst: Path, link: bool):
+        """
+        Move src to dst if dst doesn't exist yet, checked and created in one step: by
+        hardlink (then dropping src) if link, else by an exclusive create src is copied into.
+        Returns (placed, link); link turns False once hardlinks turn out not to work here.
+        """
+        if link:
+            try:
+                os.link(src, dst)
+                os.unlink(src)
+                return True, True
+            except FileExistsError:
+                return False, True
+            except OSError:
+                # e.g. a bind mount that reports the same device, or no hardlink support
+                link = False
+        try:
+            fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0))
+        except FileExistsError:
+            return False, link
+        try:
+            with open(fd, 'wb') as out, open(src, 'rb') as f:
+                shutil.copyfileobj(f, out)
+            shutil.copystat(src, dst)
+        except BaseException:
+            os.unlink(dst)
+            raise
+        return True, link
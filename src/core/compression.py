@@ -0,0 +1,66 @@
+import lzma
+import zlib
+import zipfile
+from pathlib import Path
+
+# Per-entry compression policy for ZIP based outputs (cbz/zip/epub).
+# JPEG/WebP/GIF pages are already compressed, deflating them costs the full
+# CPU time for well under 1% saving, so they are stored instead. Other
+# formats get a quick sample-compress probe to decide.
+
+PRECOMPRESSED_EXTENSIONS = {'.jpg', '.jpeg', '.webp', '.gif'}
+
+# name: (deflate level, store precompressed formats without probing, minimum probe saving to deflate)
+PRESETS = {
+    'fast': (1, True, 0.05),
+    'balanced': (6, True, 0.02),
+    'max': (9, False, 0.01),
+}
+DEFAULT_PRESET = 'balanced'
+
+# 7z outputs use the same per-page decision: pages the policy would store get
+# the COPY filter, the rest LZMA2. Consecutive pages with the same filter chain
+# are grouped into 7z folders (solid blocks) of up to block size bytes, so readers
+# can decode blocks in parallel and never have to decode a huge one to reach a page.
+# Pages stay in page order, so a short run of the other kind joins the open folder.
+# name: (LZMA2 preset, LZMA2 dictionary size, solid block size)
+SEVENZIP_PRESETS = {
+    'fast': (1, 4 * 1024 ** 2, 32 * 1024 ** 2),
+    'balanced': (6, 16 * 1024 ** 2, 64 * 1024 ** 2),
+    'max': (9 | lzma.PRESET_EXTREME, 64 * 1024 ** 2, 256 * 1024 ** 2),
+}
+_FILTER_COPY = 0x33  # py7zr.FILTER_COPY, without importing py7zr here
+
+_PROBE_SIZE = 64 * 1024
+
+
+class CompressionPolicy:
+    """Chooses STORED or DEFLATED (and the deflate level) for each entry."""
+
+    def __init__(self, preset: str = DEFAULT_PRESET):
+        if preset not in PRESETS:
+            raise ValueError(f"Unknown compression preset: {preset} (choose from {', '.join(PRESETS)})")
+        self.preset = preset
+        self.level, self.store_precompressed, self.min_saving = PRESETS[preset]
+        self.lzma_preset, self.dict_size, self.block_size = SEVENZIP_PRESETS[preset]
+
+    def choose(self, name: str, data: bytes):
+        """Return (compress_type, compresslevel) for an entry."""
+        if self.store_precompressed and Path(name).suffix.lower() in PRECOMPRESSED_EXTENSIONS:
+            return zipfile.ZIP_STORED, None
+
+        # Probe: how much does a fast deflate save on the start of the data?
+        sample = data[:_PROBE_SIZE]
+        if sample:
+            saving = 1 - len(zlib.compress(sample, 1)) / len(sample)
+            if saving < self.min_saving:
+                return zipfile.ZIP_STORED, None
+
+        return zipfile.ZIP_DEFLATED, self.level
+
+    def sevenzip_filters(self, name: str, data: bytes):
+        """py7zr filter chain for a 7z entry: COPY where a zip entry would be stored, else LZMA2."""
+        compress_type, _ = self.choose(name, data)
+        if compress_type == zipfile.ZIP_STORED:
+            return [{'id': _FILTER_COPY}]
+        return [{'id': lzma.FILTER_LZMA2, 'preset': self.lzma_preset, 'dict_size': self.dict_size}]
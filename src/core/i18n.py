@@ -11,6 +11,7 @@ TRANSLATIONS = {
         'output_dir': 'Output Directory:',
         'browse': 'Browse...',
         'start': 'Start',
+        'stop': 'Stop',
         'log': 'Log:',
         'ready': 'Ready',
         'processing': 'Processing...',
@@ -36,6 +37,7 @@ TRANSLATIONS = {
         'status_success': 'Success',
         'status_failed': 'Failed',
         'status_skipped': 'Skipped (Same Format)',
+        'status_stopped': 'Stopped',
         
         'msg_no_files': 'Please add files first',
         'msg_done_title': 'Done',
@@ -45,6 +47,7 @@ TRANSLATIONS = {
         'progress_fmt': 'Progress: {}/{} (OK {}, Fail {})',
         'drag_drop_hint': 'Drag and drop files/folders here',
         'chk_recursive': 'Recursive / Process Archives (Also convert .zip/.rar...)',
+        'chk_cache': 'Reuse earlier conversions of the same archives (cache)',
         
         'menu_language': 'Language',
         'menu_help': 'Help',
@@ -59,6 +62,14 @@ TRANSLATIONS = {
         'fmt_zip': 'ZIP',
         'fmt_rar': 'RAR (Read-only)',
         'fmt_7z': '7Z',
+        
+        'compression_label': 'Compression:',
+        'comp_fast': 'Fast',
+        'comp_balanced': 'Balanced',
+        'comp_max': 'Max',
+        'device_label': 'Device:',
+        'device_original': 'Original size',
+        'chk_eink': 'E-ink: grayscale pages, 16 gray levels',
     },
     'zh': {
         'app_title': '漫画工具箱',
@@ -71,6 +82,7 @@ TRANSLATIONS = {
         'output_dir': '输出目录:',
         'browse': '选择...',
         'start': '开始处理',
+        'stop': '停止',
         'log': '日志:',
         'ready': '就绪',
         'processing': '处理中...',
@@ -96,6 +108,7 @@ TRANSLATIONS = {
         'status_success': '成功',
         'status_failed': '失败',
         'status_skipped': '已跳过 (格式相同)',
+        'status_stopped': '已停止',
         
         'msg_no_files': '请先添加文件',
         'msg_done_title': '完成',
@@ -105,6 +118,7 @@ TRANSLATIONS = {
         'progress_fmt': '进度: {}/{} (成功 {}, 失败 {})',
         'drag_drop_hint': '将文件/文件夹拖拽至此',
         'chk_recursive': '递归 / 处理压缩包 (同时转换 .zip/.rar...)',
+        'chk_cache': '复用相同压缩包的转换结果 (缓存)',
         
         'menu_language': '语言',
         'menu_help': '帮助',
@@ -119,6 +133,14 @@ TRANSLATIONS = {
         'fmt_zip': 'ZIP',
         'fmt_rar': 'RAR',
         'fmt_7z': '7Z',
+        
+        'compression_label': '压缩:',
+        'comp_fast': '快速',
+        'comp_balanced': '均衡',
+        'comp_max': '最大',
+        'device_label': '设备:',
+        'device_original': '原始尺寸',
+        'chk_eink': '墨水屏: 灰度页面, 16 级灰阶',
     }
 }
 
@@ -0,0 +1,265 @@
+import io
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+from pathlib import PurePosixPath
+
+from src.core.page_source import Page
+from src.core.stats import NO_STATS
+
+# Optional lossy stage between reading and writing pages: downscale to a target
+# device resolution, turn effectively-gray pages into 8-bit grayscale (optionally
+# reduced to a few gray levels for e-ink) and re-encode. Pages are decoded on a
+# process pool; Pillow is only imported by the processes that do the work. A
+# batch opens that pool once (image_pool) and every conversion in it shares it.
+
+# Portrait screen resolutions (width, height)
+DEVICE_PROFILES = {
+    'kindle-paperwhite': (1236, 1648),
+    'kindle-scribe': (1860, 2480),
+    'kobo-clara': (1072, 1448),
+    'kobo-libra': (1264, 1680),
+    'kobo-sage': (1440, 1920),
+    'tablet': (1536, 2048),
+}
+
+OUTPUT_FORMATS = {'jpeg': ('JPEG', '.jpg'), 'webp': ('WEBP', '.webp'), 'png': ('PNG', '.png')}
+DEFAULT_QUALITY = 85
+# Gray levels e-ink screens can show
+EINK_LEVELS = 16
+
+# A page counts as gray if at most this fraction of its pixels has channels
+# further apart than the tolerance (JPEG chroma noise stays below it)
+_GRAY_TOLERANCE = 24
+_COLOR_FRACTION = 0.002
+# Gray detection looks at a copy reduced to about this many pixels on the short side
+_DETECT_SIZE = 256
+# EXIF Orientation; 5-8 store the page on its side
+_EXIF_ORIENTATION = 0x0112
+
+
+class ImageProcessor:
+    """
+    Fit pages into a size (a device profile or an explicit (width, height)) and
+    re-encode them. Landscape pages are fitted to the rotated box, so spreads
+    keep their detail. fmt=None keeps JPEG/WebP/PNG pages in their format.
+    grayscale: store pages that look gray as 8-bit grayscale.
+    levels: reduce grayscale pages to this many gray levels (e.g. EINK_LEVELS);
+    PNG output then becomes a 4-bit palette image.
+    Pages that need none of this are passed through untouched.
+    """
+
+    def __init__(self, profile: str | None = None, fmt: str | None = 'jpeg', quality: int = DEFAULT_QUALITY,
+                 size: tuple[int, int] | None = None, grayscale: bool = False, levels: int | None = None):
+        if profile is not None:
+            if profile not in DEVICE_PROFILES:
+                raise ValueError(f"Unknown device profile: {profile}")
+            size = DEVICE_PROFILES[profile]
+        if fmt is not None:
+            fmt = fmt.lower()
+            if fmt not in OUTPUT_FORMATS:
+                raise ValueError(f"Unsupported image format: {fmt}")
+        if not 1 <= quality <= 100:
+            raise ValueError(f"Quality must be between 1 and 100: {quality}")
+        if levels is not None and not 2 <= levels <= 256:
+            raise ValueError(f"Gray levels must be between 2 and 256: {levels}")
+        self.size = tuple(size) if size else None
+        self.fmt = fmt
+        self.quality = quality
+        self.grayscale = grayscale
+        self.levels = levels
+
+    def options(self):
+        """Settings that change the output, for cache keys and manifests."""
+        return {'size': list(self.size) if self.size else None, 'format': self.fmt, 'quality': self.quality,
+                'grayscale': self.grayscale, 'levels': self.levels}
+
+    def process(self, name: str, data: bytes):
+        """Return (name, data) of one page after resizing, gray reduction and re-encoding."""
+        # Imported here so loading the module stays cheap
+        from PIL import Image, ImageOps
+        im = Image.open(io.BytesIO(data))
+        source_format = im.format
+        pil_format, suffix = self._output_format(source_format)
+        # Re-encoded pages lose their EXIF, so pages tagged with an orientation are
+        # turned upright, and fitted to the box the way they are shown
+        orientation = im.getexif().get(_EXIF_ORIENTATION, 1)
+        oriented = orientation in range(2, 9)
+        sideways = orientation in range(5, 9)
+
+        target = self._fit(im.size[::-1] if sideways else im.size)
+        if target is not None and source_format == 'JPEG':
+            # Let libjpeg decode at 1/2, 1/4 or 1/8 scale, still at least target size
+            im.draft('L' if im.mode == 'L' else 'RGB', target[::-1] if sideways else target)
+        if oriented:
+            im = ImageOps.exif_transpose(im)
+
+        changed = target is not None or source_format != pil_format or oriented
+        if self.grayscale and im.mode not in ('1', 'L', 'LA') and _is_grayscale(im):
+            alpha = 'A' in im.getbands()
+            if im.mode not in ('RGB', 'RGBA'):
+                im = im.convert('RGBA' if alpha else 'RGB')
+            im = im.convert('LA' if alpha else 'L')
+            changed = True
+        if not changed and not (self.levels and im.mode in ('1', 'L')):
+            return name, data
+
+        im = self._encodable(im, pil_format, Image)
+        if target is not None:
+            im = im.resize(target, Image.Resampling.LANCZOS, reducing_gap=3.0)
+        if self.levels and im.mode == 'L':
+            im = self._reduce_levels(im, pil_format, Image)
+
+        out = io.BytesIO()
+        if pil_format == 'JPEG':
+            im.save(out, pil_format, quality=self.quality, optimize=True)
+        elif pil_format == 'WEBP':
+            im.save(out, pil_format, quality=self.quality, method=4)
+        else:
+            im.save(out, pil_format)
+        if source_format != pil_format:
+            name = str(PurePosixPath(name).with_suffix(suffix))
+        elif target is None and not oriented and out.tell() >= len(data):
+            # Only re-encoded to save space, and it didn't
+            return name, data
+        return name, out.getvalue()
+
+    def pages(self, pages, workers: int | None = None, stats=NO_STATS, pool: ProcessPoolExecutor | None = None):
+        """
+        Process Page records, yielding new Page records in the same order.
+        With more than one worker, pages are processed on a process pool
+        with a bounded window, so only a few pages are in flight at once.
+        stats: JobStats for the 'process' stage (with a pool, the time spent
+        waiting for results; the workers' CPU is not included).
+        pool: the batch's pool (see image_pool) to use instead of starting one;
+        workers then only sizes the window.
+        """
+        if workers is None:
+            workers = os.cpu_count() or 1
+
+        taken = set()
+
+        def page(result):
+            name, data = result
+            # 01.png and 01.jpg would both become 01.jpg
+            if name in taken:
+                path = PurePosixPath(name)
+                n = 1
+                while name in taken:
+                    name = f"{path.stem}_{n}{path.suffix}"
+                    n += 1
+            taken.add(name)
+            return Page(name, len(data), lambda: data)
+
+        def processed(run, bytes_in):
+            with stats.stage('process') as counter:
+                result = run()
+                counter.add(bytes_in=bytes_in, bytes_out=len(result[1]))
+            return page(result)
+
+        if pool is None and workers <= 1:
+            for p in pages:
+                data = p.read()
+                yield processed(partial(self.process, p.name, data), len(data))
+            return
+
+        with nullcontext(pool) if pool else ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for p in pages:
+                data = p.read()
+                pending.append((pool.submit(self.process, p.name, data), len(data)))
+                if len(pending) >= workers * 2:
+                    future, size = pending.popleft()
+                    yield processed(future.result, size)
+            while pending:
+                future, size = pending.popleft()
+                yield processed(future.result, size)
+
+    def _fit(self, image_size):
+        """Size to resize to, or None if the image already fits."""
+        if not self.size:
+            return None
+        width, height = image_size
+        box_w, box_h = self.size
+        if (width > height) != (box_w > box_h):
+            box_w, box_h = box_h, box_w
+        scale = min(box_w / width, box_h / height)
+        if scale >= 1:
+            return None
+        return max(1, round(width * scale)), max(1, round(height * scale))
+
+    def _output_format(self, source_format):
+        """(Pillow format, suffix) a page is written as."""
+        if self.fmt:
+            return OUTPUT_FORMATS[self.fmt]
+        for pil_format, suffix in OUTPUT_FORMATS.values():
+            if pil_format == source_format:
+                return pil_format, suffix
+        return OUTPUT_FORMATS['png']
+
+    @staticmethod
+    def _encodable(im, pil_format, Image):
+        """Convert to a mode the target format can store (JPEG has no alpha: flatten onto white)."""
+        has_alpha = im.mode in ('RGBA', 'LA', 'PA') or (im.mode == 'P' and 'transparency' in im.info)
+        if has_alpha:
+            gray = im.mode == 'LA'
+            im = im.convert('RGBA')
+            if pil_format != 'JPEG':
+                return im.convert('LA') if gray else im
+            background = Image.new('RGB', im.size, (255, 255, 255))
+            background.paste(im, mask=im.getchannel('A'))
+            return background.convert('L') if gray else background
+        if im.mode in ('1', 'L'):
+            return im.convert('L')
+        if im.mode != 'RGB':
+            return im.convert('RGB')
+        return im
+
+    def _reduce_levels(self, im, pil_format, Image):
+        """Snap a grayscale image to self.levels evenly spaced grays (no dithering, it compresses badly)."""
+        grays = [round(i * 255 / (self.levels - 1)) for i in range(self.levels)]
+        if pil_format == 'PNG':
+            # A palette of <= 16 entries is written as a 4-bit PNG
+            palette = Image.new('P', (1, 1))
+            palette.putpalette([g for g in grays for _ in range(3)])
+            return im.quantize(palette=palette, dither=Image.Dither.NONE)
+        step = 255 / (self.levels - 1)
+        return im.point([grays[round(v / step)] for v in range(256)])
+
+
+def image_pool(workers: int | None = None):
+    """
+    Process pool for the page processing of a whole batch, shared by all its
+    conversions (see ImageProcessor.pages), so running several side by side
+    doesn't start a pool per book. workers: default one per CPU.
+    """
+    return ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1)
+
+
+def device_processor(profile: str | None = None, eink: bool = False):
+    """
+    ImageProcessor for a device profile and/or e-ink gray reduction, or None
+    if neither is wanted. Resized pages become JPEG unless e-ink is on, which
+    keeps each page's format so gray PNGs can shrink to 4-bit.
+    """
+    if not profile and not eink:
+        return None
+    return ImageProcessor(profile, None if eink else 'jpeg', grayscale=eink, levels=EINK_LEVELS if eink else None)
+
+
+def _is_grayscale(im):
+    """
+    Cheap check whether a color image is visually gray: compare the channels
+    of a reduced copy and count the pixels where they differ.
+    """
+    from PIL import ImageChops
+    small = im if im.mode == 'RGB' else im.convert('RGB')
+    factor = min(small.size) // _DETECT_SIZE
+    if factor > 1:
+        small = small.reduce(factor)
+    r, g, b = small.split()
+    diff = ImageChops.lighter(ImageChops.difference(r, g), ImageChops.difference(g, b))
+    colored = sum(diff.histogram()[_GRAY_TOLERANCE:])
+    return colored <= small.width * small.height * _COLOR_FRACTION
@@ -0,0 +1,160 @@
+import os
+import json
+import hashlib
+from pathlib import Path
+
+from src.core.utils import is_image_file
+
+# Persistent record of what was converted from what, so re-runs over a library
+# only rebuild sources that changed. Stored as JSON next to the outputs.
+
+MANIFEST_NAME = '.comic-utils-manifest.json'
+MANIFEST_VERSION = 1
+
+# Bytes hashed from the start, middle and end of a file for its fingerprint
+_SAMPLE_SIZE = 256 * 1024
+
+
+def file_fingerprint(path: Path, size: int | None = None):
+    """
+    Fast content fingerprint of a file: size plus samples from the start,
+    middle and end. Cheap even for multi-GB archives.
+    """
+    if size is None:
+        size = os.path.getsize(path)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str(size).encode())
+    with open(path, 'rb') as f:
+        for offset in sorted({0, max(0, size // 2 - _SAMPLE_SIZE // 2), max(0, size - _SAMPLE_SIZE)}):
+            f.seek(offset)
+            h.update(f.read(_SAMPLE_SIZE))
+    return h.hexdigest()
+
+
+def source_state(path: Path, is_archive: bool):
+    """
+    Stat-based state of a conversion source: {'size', 'mtime'}.
+    For folders these cover the image files only (total size, newest mtime), plus
+    their 'count' and a hash of their 'names': renaming a page keeps both its
+    size and mtime but changes the page order.
+    """
+    if is_archive:
+        st = os.stat(path)
+        return {'size': st.st_size, 'mtime': st.st_mtime_ns}
+
+    size = 0
+    mtime = 0
+    names = []
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_file() and is_image_file(entry.name):
+                st = entry.stat()
+                size += st.st_size
+                mtime = max(mtime, st.st_mtime_ns)
+                names.append(entry.name)
+    names.sort()
+    names_hash = hashlib.blake2b('\n'.join(names).encode('utf-8'), digest_size=16).hexdigest()
+    return {'size': size, 'mtime': mtime, 'count': len(names), 'names': names_hash}
+
+
+def source_fingerprint(path: Path, is_archive: bool):
+    """Content fingerprint of a conversion source (archive file or image folder)."""
+    if is_archive:
+        return file_fingerprint(path)
+
+    # A folder is identified by its image listing (names, sizes, mtimes)
+    listing = []
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_file() and is_image_file(entry.name):
+                st = entry.stat()
+                listing.append(f"{entry.name}\0{st.st_size}\0{st.st_mtime_ns}")
+    listing.sort()
+    return hashlib.blake2b('\n'.join(listing).encode('utf-8'), digest_size=16).hexdigest()
+
+
+class ConversionManifest:
+    """On-disk map of (source, format) -> source state, options and output of the last good conversion."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.entries = {}
+        self._dirty = False
+        if self.path.exists():
+            try:
+                data = json.loads(self.path.read_text(encoding='utf-8'))
+                if data.get('version') == MANIFEST_VERSION:
+                    self.entries = data.get('entries', {})
+            except (OSError, ValueError):
+                # A broken manifest just means everything is rebuilt
+                self.entries = {}
+
+    @staticmethod
+    def _key(source_path: Path, fmt: str):
+        return f"{Path(source_path).resolve()}|{fmt}"
+
+    def is_up_to_date(self, source_path: Path, is_archive: bool, fmt: str, options: dict, output_path: Path, state: dict):
+        """
+        True if output_path was built from this exact source with the same options.
+        state comes from source_state(); a content fingerprint is only computed
+        (and cached in state) when size matches but mtime changed.
+        """
+        entry = self.entries.get(self._key(source_path, fmt))
+        if not entry or entry.get('options') != options or entry.get('output') != str(output_path):
+            return False
+
+        try:
+            if os.path.getsize(output_path) != entry.get('output_size'):
+                return False
+        except OSError:
+            return False
+
+        if entry.get('size') != state['size']:
+            return False
+        # Folders only, archives have neither
+        if entry.get('count') != state.get('count') or entry.get('names') != state.get('names'):
+            return False
+        if entry.get('mtime') == state['mtime']:
+            return True
+
+        # Touched but maybe not changed
+        if 'fingerprint' not in state:
+            state['fingerprint'] = source_fingerprint(source_path, is_archive)
+        if entry.get('fingerprint') != state['fingerprint']:
+            return False
+        # Same content: remember the new mtime so next run is stat-only again
+        entry['mtime'] = state['mtime']
+        self._dirty = True
+        return True
+
+    def record(self, source_path: Path, is_archive: bool, fmt: str, options: dict, output_path: Path, state: dict):
+        """Remember a successful conversion. state should be taken before converting."""
+        if 'fingerprint' not in state:
+            state['fingerprint'] = source_fingerprint(source_path, is_archive)
+        self.entries[self._key(source_path, fmt)] = {
+            'size': state['size'],
+            'mtime': state['mtime'],
+            'count': state.get('count'),
+            'names': state.get('names'),
+            'fingerprint': state['fingerprint'],
+            'format': fmt,
+            'options': options,
+            'output': str(output_path),
+            'output_size': os.path.getsize(output_path),
+        }
+        self._dirty = True
+
+    def forget(self, source_path: Path, fmt: str):
+        if self.entries.pop(self._key(source_path, fmt), None) is not None:
+            self._dirty = True
+
+    def save(self):
+        """Write the manifest atomically (only if something changed)."""
+        if not self._dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        tmp_path.write_text(json.dumps({'version': MANIFEST_VERSION, 'entries': self.entries}, indent=1),
+                            encoding='utf-8')
+        os.replace(tmp_path, self.path)
+        self._dirty = False
@@ -0,0 +1,128 @@
+import struct
+
+# Image records of MOBI/AZW3 (PalmDB) books, read straight from the file. A
+# PalmDB is a header plus a table of record offsets; record 0 holds the PalmDOC
+# and MOBI headers, and images are stored whole, one per record, from the
+# MOBI header's first resource index on. Combined MOBI7/KF8 files keep their
+# images once, in the MOBI7 part before the BOUNDARY record, which is where
+# the walk stops. Nothing but the record table and the record heads is read
+# until a page is asked for.
+
+_PALMDB_HEADER = struct.Struct(">32s28x8s8xH")  # name, type + creator, record count
+_RECORD_INFO = struct.Struct(">L4x")
+_NO_INDEX = 0xFFFFFFFF
+
+# Offsets in record 0
+_TEXT_RECORDS = 0x08
+_MOBI_MAGIC = 0x10
+_MOBI_HEADER_LENGTH = 0x14
+_FIRST_RESOURCE = 0x6C
+_EXTH_FLAGS = 0x80
+_HAS_EXTH = 0x40
+
+# EXTH record types: record number of the cover / thumbnail, relative to the first resource
+_EXTH_COVER = 201
+_EXTH_THUMB = 202
+
+_BOUNDARY = b"BOUNDARY"
+
+
+def _image_type(head: bytes):
+    """Image extension for the first bytes of a record, None if it isn't an image."""
+    if head.startswith(b"\xff\xd8"):
+        return 'jpeg'
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return 'png'
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return 'gif'
+    if head.startswith(b"BM"):
+        return 'bmp'
+    return None
+
+
+def read_records(fp):
+    """(offset, length) of every record of a PalmDB book; fp is a binary file object."""
+    fp.seek(0, 2)
+    file_size = fp.tell()
+    fp.seek(0)
+    header = fp.read(_PALMDB_HEADER.size)
+    if len(header) < _PALMDB_HEADER.size:
+        raise ValueError("Not a MOBI/AZW3 file: truncated header")
+    _, ident, count = _PALMDB_HEADER.unpack(header)
+    if ident != b"BOOKMOBI":
+        raise ValueError(f"Not a MOBI/AZW3 file: {ident!r}")
+
+    table = fp.read(_RECORD_INFO.size * count)
+    if len(table) < _RECORD_INFO.size * count:
+        raise ValueError("Not a MOBI/AZW3 file: truncated record table")
+    offsets = [offset for offset, in _RECORD_INFO.iter_unpack(table)] + [file_size]
+    if any(b < a for a, b in zip(offsets, offsets[1:])):
+        raise ValueError("Corrupt MOBI/AZW3 file: record offsets out of order")
+    return [(a, b - a) for a, b in zip(offsets, offsets[1:])]
+
+
+def _exth(record0: bytes):
+    """{type: value} of the integer EXTH records in record 0."""
+    values = {}
+    if record0[_MOBI_MAGIC:_MOBI_MAGIC + 4] != b"MOBI" or len(record0) < _EXTH_FLAGS + 4:
+        return values
+    header_length, = struct.unpack_from(">L", record0, _MOBI_HEADER_LENGTH)
+    flags, = struct.unpack_from(">L", record0, _EXTH_FLAGS)
+    start = _MOBI_MAGIC + header_length
+    if not flags & _HAS_EXTH or record0[start:start + 4] != b"EXTH":
+        return values
+    length, count = struct.unpack_from(">LL", record0, start + 4)
+    pos = start + 12
+    end = min(start + length, len(record0))
+    for _ in range(count):
+        if pos + 8 > end:
+            break
+        kind, size = struct.unpack_from(">LL", record0, pos)
+        if size < 8:
+            break
+        if size == 12:
+            values[kind], = struct.unpack_from(">L", record0, pos + 8)
+        pos += size
+    return values
+
+
+def image_records(fp):
+    """
+    (name, offset, length) of the image records of a MOBI/AZW3 book, in record
+    order. Names follow KindleUnpack (image00012.jpeg, cover00011.jpeg); the
+    thumbnail (a small copy of the cover) is left out.
+    """
+    records = read_records(fp)
+    if not records:
+        return []
+    offset, length = records[0]
+    fp.seek(offset)
+    record0 = fp.read(length)
+    if len(record0) < _TEXT_RECORDS + 2:
+        raise ValueError("Corrupt MOBI/AZW3 file: short header record")
+
+    first = _NO_INDEX
+    if len(record0) >= _FIRST_RESOURCE + 4 and record0[_MOBI_MAGIC:_MOBI_MAGIC + 4] == b"MOBI":
+        first, = struct.unpack_from(">L", record0, _FIRST_RESOURCE)
+    if first == _NO_INDEX:
+        # Old books without the field: resources follow the text records
+        first, = struct.unpack_from(">H", record0, _TEXT_RECORDS)
+        first += 1
+
+    exth = _exth(record0)
+    cover = first + exth[_EXTH_COVER] if _EXTH_COVER in exth and exth[_EXTH_COVER] != _NO_INDEX else None
+    thumb = first + exth[_EXTH_THUMB] if _EXTH_THUMB in exth and exth[_EXTH_THUMB] != _NO_INDEX else None
+
+    images = []
+    for index in range(first, len(records)):
+        offset, length = records[index]
+        fp.seek(offset)
+        head = fp.read(min(length, 8))
+        if head == _BOUNDARY and length == len(_BOUNDARY):
+            break
+        ext = _image_type(head)
+        if ext is None or index == thumb:
+            continue
+        name = f"{'cover' if index == cover else 'image'}{index:05d}.{ext}"
+        images.append((name, offset, length))
+    return images
@@ -0,0 +1,124 @@
+import os
+import sys
+import json
+import shutil
+import threading
+import hashlib
+from pathlib import Path
+
+# Content-addressed cache of converted outputs. Entries are keyed by a hash of
+# the source content plus target format and options, so converting the same
+# book again (even under another name) is served from the cache. Entries are
+# evicted least-recently-used once the cache grows past its size budget;
+# the entry mtime is the LRU clock.
+
+DEFAULT_CACHE_SIZE = 2 * 1024 ** 3
+CACHE_VERSION = 1
+
+_HASH_CHUNK = 1 << 20
+
+
+def default_cache_dir():
+    """Per-user cache location for converted outputs."""
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or Path.home() / 'AppData' / 'Local'
+    elif sys.platform == 'darwin':
+        base = Path.home() / 'Library' / 'Caches'
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache'
+    return Path(base) / 'comic-utils' / 'outputs'
+
+
+def content_hash(path: Path):
+    """Hash of a file's full content (blake2b releases the GIL on large chunks)."""
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class OutputCache:
+    """Size-bounded LRU cache of converted files, served by hardlink (or copy across filesystems)."""
+
+    def __init__(self, cache_dir: Path | None = None, max_bytes: int = DEFAULT_CACHE_SIZE):
+        self.cache_dir = Path(cache_dir) if cache_dir else default_cache_dir()
+        self.max_bytes = max_bytes
+
+    def key(self, source_path: Path, fmt: str, options: dict, digest: str | None = None):
+        """
+        Cache key for converting the archive/ebook at source_path to fmt with options.
+        digest: content_hash(source_path) if already known, so one source hashed once serves several formats
+        """
+        if digest is None:
+            digest = content_hash(source_path)
+        h = hashlib.blake2b(digest_size=20)
+        h.update(json.dumps([CACHE_VERSION, fmt.lower(), options], sort_keys=True).encode('utf-8'))
+        h.update(digest.encode())
+        return h.hexdigest()
+
+    def _entry(self, key):
+        return self.cache_dir / key[:2] / key
+
+    def fetch(self, key, output_path: Path):
+        """Materialize a cached output at output_path. Returns False on a miss."""
+        entry = self._entry(key)
+        if not entry.is_file():
+            return False
+        try:
+            self._place(entry, Path(output_path))
+            # Mark as recently used
+            os.utime(entry)
+        except FileNotFoundError:
+            # Evicted by another process in the meantime
+            return False
+        return True
+
+    def store(self, key, output_path: Path):
+        """Add a freshly converted output to the cache, then enforce the size budget."""
+        if Path(output_path).stat().st_size > self.max_bytes:
+            # It would be the first thing evicted, after pushing everything else out
+            return
+        entry = self._entry(key)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        self._place(Path(output_path), entry)
+        self._evict()
+
+    @staticmethod
+    def _place(src: Path, dst: Path):
+        """Hardlink src to dst (copy if that's not possible), replacing dst atomically."""
+        tmp = dst.with_name(f".{dst.name}.{os.getpid()}-{threading.get_ident()}.tmp")
+        if tmp.exists():
+            tmp.unlink()
+        try:
+            os.link(src, tmp)
+        except OSError:
+            # Different filesystem, or no hardlink support
+            shutil.copyfile(src, tmp)
+        os.replace(tmp, dst)
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits max_bytes."""
+        entries = []
+        total = 0
+        for root, dirs, files in os.walk(self.cache_dir):
+            for f in files:
+                if f.startswith('.'):
+                    continue
+                path = Path(root) / f
+                try:
+                    st = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
@@ -0,0 +1,357 @@
+import os
+import shutil
+import zipfile
+import tempfile
+import threading
+from functools import partial
+from pathlib import Path, PurePosixPath
+from typing import Callable, NamedTuple
+
+from src.core.mobi_reader import image_records
+from src.core.pdf_render import PdfRenderer, RenderPool
+from src.core.utils import candidate_names, is_image_file, natural_sort_key
+
+# Ordered, lazily read pages of an image folder, archive or ebook. Opening a
+# source only reads its index; page data is decoded when a page's read() is
+# called. Every writer in ArchiveManager consumes these, so conversions stream
+# page by page and page counts are available without extracting anything.
+
+
+def _load_fitz():
+    try:
+        import pymupdf as fitz
+    except ImportError:
+        # PyMuPDF < 1.24.3 only ships the old module name
+        import fitz
+    return fitz
+
+
+class Page(NamedTuple):
+    """One image of a source. size is the stored size in bytes (0 if unknown)."""
+    name: str
+    size: int
+    read: Callable[[], bytes]
+
+
+def timed_pages(pages, stats):
+    """Page records whose read() is recorded as the 'read' stage of stats (a JobStats)."""
+    if not stats.enabled:
+        return pages
+
+    def timed_read(page):
+        with stats.stage('read') as read:
+            data = page.read()
+            read.add(bytes_in=len(data))
+        return data
+
+    return [Page(page.name, page.size, partial(timed_read, page)) for page in pages]
+
+
+def open_source(path: Path, pdf_render: PdfRenderer | None = None, workers: int | None = None):
+    """
+    Open the folder, archive or ebook at path as a PageSource.
+    pdf_render, workers: page rendering for PDFs (see PdfSource)
+    """
+    path = Path(path)
+    if path.is_dir():
+        return FolderSource(path)
+    ext = path.suffix.lower()
+    if ext not in _SOURCE_TYPES:
+        raise ValueError(f"Unsupported format: {ext}")
+    if ext == '.pdf' and pdf_render:
+        return PdfSource(path, render=pdf_render, workers=workers)
+    return _SOURCE_TYPES[ext](path)
+
+
+class PageSource:
+    """
+    Base class: self.pages is the ordered list of Page records, built on open.
+    Pages stay readable until close().
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.pages = []
+        self._lock = threading.Lock()
+        self._spill_dir = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __len__(self):
+        return len(self.pages)
+
+    def __iter__(self):
+        return iter(self.pages)
+
+    def close(self):
+        if self._spill_dir:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = None
+
+    def _read_spilled(self, member_path):
+        """
+        read() for archives that can only be decoded front to back (solid 7z/rar):
+        the first read unpacks every image to a temp dir in one pass.
+        """
+        with self._lock:
+            if self._spill_dir is None:
+                spill_dir = tempfile.mkdtemp(prefix='comic-utils-')
+                try:
+                    self._extract_images(Path(spill_dir))
+                except BaseException:
+                    shutil.rmtree(spill_dir, ignore_errors=True)
+                    raise
+                self._spill_dir = spill_dir
+        return (Path(self._spill_dir) / member_path).read_bytes()
+
+    def _extract_images(self, target_dir: Path):
+        raise NotImplementedError
+
+
+class FolderSource(PageSource):
+    """Images directly inside a folder, in natural order."""
+
+    def __init__(self, path: Path):
+        super().__init__(path)
+        with os.scandir(self.path) as it:
+            entries = [e for e in it if e.is_file() and is_image_file(e.name)]
+        entries.sort(key=lambda e: natural_sort_key(e.name))
+        self.pages = [Page(e.name, e.stat().st_size, partial(Path(e.path).read_bytes)) for e in entries]
+
+
+class ZipSource(PageSource):
+    """zip/cbz/epub; members are read straight from the open archive."""
+
+    def __init__(self, path: Path):
+        super().__init__(path)
+        self.zf = zipfile.ZipFile(self.path, 'r')
+        members = [i for i in self.zf.infolist() if not i.is_dir() and is_image_file(i.filename)]
+        # (name, ZipInfo) in page order, for raw member copies
+        self.members = _page_order(members, lambda i: i.filename)
+        self.pages = [Page(name, info.file_size, partial(self.zf.read, info)) for name, info in self.members]
+
+    def close(self):
+        self.zf.close()
+        super().close()
+
+
+class SevenZipSource(PageSource):
+    """
+    7z/cb7. py7zr decodes solid blocks front to back, so the first read starts
+    one decoding pass that streams every page through a small window (see
+    sevenzip_stream). A page read again, after the stream went past it, comes
+    from a one-off extraction of the whole archive to a temp dir.
+    """
+
+    def __init__(self, path: Path):
+        super().__init__(path)
+        import py7zr
+        with py7zr.SevenZipFile(self.path, mode='r') as zf:
+            members = [f for f in zf.list() if not f.is_directory and is_image_file(f.filename)]
+        self._targets = [f.filename for f in members]
+        self._stream = None
+        self.pages = [Page(name, f.uncompressed or 0, partial(self._read, f.filename))
+                      for name, f in _page_order(members, lambda f: f.filename)]
+
+    def _read(self, member_name):
+        with self._lock:
+            if self._stream is None and self._spill_dir is None:
+                from src.core.sevenzip_stream import SevenZipStream
+                self._stream = SevenZipStream(self.path, self._targets)
+            stream = self._stream
+        if stream is not None:
+            try:
+                return stream.read(member_name)
+            except KeyError:
+                pass
+        return self._read_spilled(member_name)
+
+    def _extract_images(self, target_dir: Path):
+        import py7zr
+        with py7zr.SevenZipFile(self.path, mode='r') as zf:
+            zf.extract(target_dir, targets=self._targets)
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+        super().close()
+
+
+class RarSource(PageSource):
+    """rar/cbr (requires unrar)."""
+
+    def __init__(self, path: Path):
+        super().__init__(path)
+        try:
+            import rarfile
+            self.rf = rarfile.RarFile(self.path)
+        except Exception as e:
+            raise RuntimeError(f"RAR extraction failed (ensure unrar/UnRAR.dll is installed): {e}")
+        self._members = [i for i in self.rf.infolist() if not i.is_dir() and is_image_file(i.filename)]
+        # Reading a single member of a solid RAR restarts unrar from the
+        # beginning, so those are extracted in one pass instead.
+        solid = self.rf.is_solid()
+        self.pages = [
+            Page(name, info.file_size,
+                 partial(self._read_spilled, info.filename) if solid else partial(self.rf.read, info))
+            for name, info in _page_order(self._members, lambda i: i.filename)
+        ]
+
+    def _extract_images(self, target_dir: Path):
+        self.rf.extractall(target_dir, members=self._members)
+
+    def close(self):
+        self.rf.close()
+        super().close()
+
+
+class PdfSource(PageSource):
+    """
+    Embedded images of a PDF, named page{page:04d}_img{index:02d}.{ext}.
+    dedupe: an image used on several pages (same xref, e.g. a logo) is only listed where it first appears.
+    render: optional PdfRenderer; the pages it picks are rendered whole instead,
+    named page{page:04d}.{ext}, on up to workers processes (default: one per CPU).
+    The other pages then only list their page image, overlays are left out.
+    images holds (name, page index, xref, ext) of every page, xref None for rendered
+    pages; see read_pdf_item().
+    """
+
+    def __init__(self, path: Path, dedupe: bool = False, render: PdfRenderer | None = None,
+                 workers: int | None = None):
+        super().__init__(path)
+        try:
+            self.fitz = _load_fitz()
+            self.doc = self.fitz.open(self.path)
+        except Exception as e:
+            raise RuntimeError(f"PDF extraction failed: {e}")
+
+        self.render = render
+        self.images = []
+        seen = set()
+        for i in range(len(self.doc)):
+            page = self.doc[i]
+            page_xref = None
+            if render:
+                page_xref = render.page_image(page)
+                if page_xref is None:
+                    self.images.append((render.page_name(i), i, None, render.fmt))
+                    continue
+            for img_index, img in enumerate(page.get_images(full=True)):
+                xref, filter_name = img[0], img[8]
+                if page_xref is not None and xref != page_xref:
+                    continue
+                if dedupe:
+                    if xref in seen:
+                        continue
+                    seen.add(xref)
+                # JPEG/JPEG 2000 come out as stored, everything else as PNG
+                ext = {'DCTDecode': 'jpeg', 'JPXDecode': 'jpx'}.get(filter_name, 'png')
+                self.images.append((f"page{i+1:04d}_img{img_index+1:02d}.{ext}", i, xref, ext))
+
+        rendered = [i for name, i, xref, ext in self.images if xref is None]
+        if workers is None:
+            workers = os.cpu_count() or 1
+        self._renderer = None
+        if len(rendered) > 1 and workers > 1:
+            self._renderer = RenderPool(self.path, rendered, render, min(workers, len(rendered)))
+
+        for item in self.images:
+            name, i, xref, ext = item
+            size = self._stored_size(xref) if xref is not None else 0
+            if xref is None and self._renderer:
+                read = partial(self._renderer.render, i)
+            else:
+                read = partial(self.read_item, item)
+            self.pages.append(Page(name, size, read))
+
+    @property
+    def rendered(self):
+        """Number of pages that are rendered."""
+        return sum(1 for item in self.images if item[2] is None)
+
+    def read_item(self, item):
+        return read_pdf_item(self.fitz, self.doc, item, self.render)
+
+    def _stored_size(self, xref):
+        kind, value = self.doc.xref_get_key(xref, 'Length')
+        return int(value) if kind == 'int' else 0
+
+    def close(self):
+        if self._renderer:
+            self._renderer.close()
+        self.doc.close()
+        super().close()
+
+
+def read_pdf_item(fitz, doc, item, render=None):
+    """Data of one (name, page index, xref, ext) entry of PdfSource.images."""
+    name, index, xref, ext = item
+    if xref is None:
+        return render.render(fitz, doc, index)
+    return read_pdf_image(fitz, doc, xref, ext)
+
+
+def read_pdf_image(fitz, doc, xref, ext):
+    """Data of the image at xref of an open fitz document, as the ext PdfSource named it with."""
+    base_image = doc.extract_image(xref)
+    if base_image['ext'] == ext:
+        return base_image['image']
+    # Stored in a format the name doesn't promise (e.g. JBIG2), render it to PNG
+    pix = fitz.Pixmap(doc, xref)
+    if pix.colorspace and pix.colorspace.n > 3:
+        pix = fitz.Pixmap(fitz.csRGB, pix)
+    return pix.tobytes('png')
+
+
+class MobiSource(PageSource):
+    """MOBI/AZW3; image records are read straight from the book file (see mobi_reader)."""
+
+    def __init__(self, path: Path):
+        super().__init__(path)
+        self.fp = open(self.path, 'rb')
+        try:
+            records = image_records(self.fp)
+        except BaseException:
+            self.fp.close()
+            raise
+        self.pages = [Page(name, length, partial(self._read, offset, length))
+                      for name, (_, offset, length) in _page_order(records, lambda r: r[0])]
+
+    def _read(self, offset, length):
+        with self._lock:
+            self.fp.seek(offset)
+            return self.fp.read(length)
+
+    def close(self):
+        self.fp.close()
+        super().close()
+
+
+_SOURCE_TYPES = {
+    '.zip': ZipSource, '.cbz': ZipSource, '.epub': ZipSource,
+    '.7z': SevenZipSource, '.cb7': SevenZipSource,
+    '.rar': RarSource, '.cbr': RarSource,
+    '.pdf': PdfSource,
+    '.mobi': MobiSource, '.azw3': MobiSource, '.azw': MobiSource,
+}
+
+
+def _page_order(members, member_path):
+    """
+    Flatten archive members to unique file names and return [(name, member)] in natural order.
+    Clashing names get their parent folder as prefix, then a number, same as extract_archive.
+    """
+    seen = set()
+    ordered = []
+    for member in members:
+        path = PurePosixPath(member_path(member).replace('\\', '/'))
+        name = next(n for n in candidate_names(path.name, path.parent.name) if n not in seen)
+        seen.add(name)
+        ordered.append((name, member))
+    ordered.sort(key=lambda item: natural_sort_key(item[0]))
+    return ordered
@@ -0,0 +1,73 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+from pathlib import Path
+
+from src.core.page_source import PdfSource, _load_fitz, read_pdf_item
+from src.core.pdf_render import PdfRenderer
+from src.core.pipeline import Cancelled, PipelineConfig, check_cancel, read_ahead
+
+# PDF image extraction. Scanned books often repeat one image object (a logo, a
+# blank background) on many pages, so every xref is written once, under the
+# name of the page it first appears on. Decoding is CPU bound and PyMuPDF holds
+# the GIL, so big documents are cut into page ranges that worker processes
+# extract side by side, each with its own fitz document. Pages picked for
+# rendering (see pdf_render) are rendered by the same workers.
+
+# Fewer pages than this per worker isn't worth a process start
+MIN_PAGES_PER_WORKER = 50
+# Same for rendered pages, which cost far more each
+MIN_RENDERED_PER_WORKER = 4
+# Ranges per worker, so one slow range doesn't leave the other workers idle
+RANGES_PER_WORKER = 4
+
+
+def extract_pdf_images(input_path: Path, output_dir: Path, workers: int | None = None,
+                       pipeline: PipelineConfig | None = None, render: PdfRenderer | None = None,
+                       cancel: threading.Event | None = None):
+    """
+    Write the embedded images of a PDF into output_dir, each image object once.
+    workers: processes for big documents (default: one per CPU); 1 extracts in this process.
+    pipeline: read-ahead limits when extracting in this process (see pipeline)
+    render: optional PdfRenderer for pages that are rendered instead
+    cancel: optional Event; once set, pipeline.Cancelled is raised (workers stop after their range)
+    Returns the number of images written.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    with PdfSource(input_path, dedupe=True, render=render, workers=1) as source:
+        workers = min(workers, max(len(source.doc) // MIN_PAGES_PER_WORKER,
+                                   source.rendered // MIN_RENDERED_PER_WORKER))
+        if workers <= 1:
+            # Images are decoded ahead on the reader thread while this one writes them out
+            with closing(read_ahead(source, pipeline)) as pages:
+                for page in pages:
+                    check_cancel(cancel)
+                    (output_dir / page.name).write_bytes(page.read())
+            return len(source)
+        images = source.images
+
+    # Contiguous slices of the (page ordered) image list, i.e. page ranges
+    count = min(workers * RANGES_PER_WORKER, len(images))
+    bounds = [len(images) * i // count for i in range(count + 1)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_extract_range, str(input_path), images[start:end], str(output_dir), render)
+                   for start, end in zip(bounds, bounds[1:])]
+        count = 0
+        for future in futures:
+            if cancel is not None and cancel.is_set():
+                # Queued ranges are dropped, running ones finish
+                pool.shutdown(cancel_futures=True)
+                raise Cancelled("Stopped")
+            count += future.result()
+        return count
+
+
+def _extract_range(input_path, images, output_dir, render):
+    """Worker: write the PdfSource.images entries of one page range."""
+    fitz = _load_fitz()
+    with fitz.open(input_path) as doc:
+        for item in images:
+            Path(output_dir, item[0]).write_bytes(read_pdf_item(fitz, doc, item, render))
+    return len(images)
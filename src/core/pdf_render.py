@@ -0,0 +1,124 @@
+from concurrent.futures import ProcessPoolExecutor
+
+# Page rasterization for PDFs whose pages are not one image each. Scanners often
+# store a page as dozens of horizontal strips, and born-digital books draw pages
+# as vector content; taking their embedded images gives fragments or nothing.
+# Such pages are rendered with PyMuPDF instead, at a chosen DPI and colorspace.
+# Rendering is CPU bound and holds the GIL, so it runs on worker processes,
+# each with its own copy of the document.
+
+RENDER_MODES = ['auto', 'all']
+COLORSPACES = ['rgb', 'gray']
+RENDER_FORMATS = {'png': '.png', 'jpeg': '.jpg'}
+DEFAULT_DPI = 150
+DEFAULT_QUALITY = 90
+
+# In 'auto' mode an image covering at least this much of a page is the page
+_FULL_PAGE = 0.9
+
+
+class PdfRenderer:
+    """
+    Decides which PDF pages are rendered and renders them.
+    mode: 'auto' renders pages that no single image covers (strips, vector
+    content, inline images); 'all' renders every page.
+    fmt: 'png' (lossless) or 'jpeg' (quality 1-100) for the rendered pages.
+    """
+
+    def __init__(self, mode: str = 'auto', dpi: int = DEFAULT_DPI, colorspace: str = 'rgb', fmt: str = 'png',
+                 quality: int = DEFAULT_QUALITY):
+        if mode not in RENDER_MODES:
+            raise ValueError(f"Unknown render mode: {mode}")
+        if colorspace not in COLORSPACES:
+            raise ValueError(f"Unknown colorspace: {colorspace}")
+        if fmt not in RENDER_FORMATS:
+            raise ValueError(f"Unsupported render format: {fmt}")
+        if not 18 <= dpi <= 1200:
+            raise ValueError(f"DPI must be between 18 and 1200: {dpi}")
+        self.mode = mode
+        self.dpi = dpi
+        self.colorspace = colorspace
+        self.fmt = fmt
+        self.quality = quality
+
+    def options(self):
+        """Settings that change the output, for cache keys."""
+        return {'mode': self.mode, 'dpi': self.dpi, 'colorspace': self.colorspace, 'format': self.fmt,
+                'quality': self.quality}
+
+    def page_name(self, index: int):
+        return f"page{index + 1:04d}{RENDER_FORMATS[self.fmt]}"
+
+    def page_image(self, page):
+        """
+        xref of the image that is a fitz page, or None if the page is rendered. A page
+        whose largest image covers it is that image; smaller images on it (logos,
+        watermarks, credits) are overlays and left out.
+        """
+        if self.mode == 'all':
+            return None
+        page_area = abs(page.rect)
+        if not page_area:
+            return None
+        # Every image drawn on the page, inline ones included (get_images() misses those)
+        infos = page.get_image_info(xrefs=True)
+        if not infos:
+            return None
+        largest = max(infos, key=lambda info: abs(page.rect & info['bbox']))
+        # Inline images (xref 0) can't be taken out as they are
+        if not largest['xref'] or abs(page.rect & largest['bbox']) / page_area < _FULL_PAGE:
+            return None
+        return largest['xref']
+
+    def render(self, fitz, doc, index: int):
+        """Encoded image of page index of an open fitz document."""
+        colorspace = fitz.csGRAY if self.colorspace == 'gray' else fitz.csRGB
+        pix = doc[index].get_pixmap(dpi=self.dpi, colorspace=colorspace, alpha=False)
+        if self.fmt == 'jpeg':
+            return pix.tobytes('jpeg', jpg_quality=self.quality)
+        return pix.tobytes('png')
+
+
+class RenderPool:
+    """
+    Renders pages on a process pool, up to workers * 2 pages ahead of the one
+    asked for, in the order given. Each worker opens the document once.
+    """
+
+    def __init__(self, path, indexes, renderer: PdfRenderer, workers: int):
+        self._renderer = renderer
+        self._order = list(indexes)
+        self._next = 0
+        self._window = workers * 2
+        self._futures = {}
+        self._pool = ProcessPoolExecutor(max_workers=workers, initializer=_open_document, initargs=(str(path),))
+
+    def render(self, index: int) -> bytes:
+        future = self._futures.pop(index, None) or self._pool.submit(_render, self._renderer, index)
+        # Keep the workers busy with the pages that come next
+        while self._next < len(self._order) and len(self._futures) < self._window:
+            upcoming = self._order[self._next]
+            self._next += 1
+            if upcoming != index and upcoming not in self._futures:
+                self._futures[upcoming] = self._pool.submit(_render, self._renderer, upcoming)
+        return future.result()
+
+    def close(self):
+        self._futures.clear()
+        self._pool.shutdown(cancel_futures=True)
+
+
+# The worker process' document, opened by the pool initializer
+_document = None
+
+
+def _open_document(path):
+    global _document
+    from src.core.page_source import _load_fitz
+    fitz = _load_fitz()
+    _document = fitz, fitz.open(path)
+
+
+def _render(renderer, index):
+    fitz, doc = _document
+    return renderer.render(fitz, doc, index)
@@ -0,0 +1,189 @@
+import io
+import struct
+import zlib
+
+# Streaming image-to-PDF writer. Every page is written to the output file as
+# soon as it is added and only the object offsets are kept in memory, so peak
+# memory is about one page no matter how long the document is.
+# JPEGs (and plain 8-bit PNGs) are embedded without re-encoding.
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+_DEFAULT_DPI = 96
+# EXIF Orientation -> page /Rotate, as img2pdf maps it (mirrored orientations aren't representable)
+_EXIF_ORIENTATION = 0x0112
+_ROTATIONS = {3: 180, 6: 90, 8: 270}
+
+
+class PdfWriter:
+    """Append image pages to a PDF file, then write the xref on close()."""
+
+    # Fixed object numbers; the page tree is written last, once all kids are known
+    CATALOG = 1
+    PAGES = 2
+
+    def __init__(self, fp):
+        self.fp = fp
+        self._offsets = {}
+        self._kids = []
+        self._next_obj = 3
+        self.fp.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+
+    def add_page(self, data: bytes):
+        """
+        Add one image (encoded file bytes) as a page sized to the image. An EXIF
+        orientation is kept as the page's /Rotate, the pixels are stored as they are.
+        """
+        image_dict, stream, width, height, dpi, rotate = self._image_object(data)
+
+        image_obj = self._alloc()
+        self._write_stream(image_obj, image_dict, stream)
+        # Free the encoded image before building the rest of the page
+        del stream
+
+        page_w = width * 72.0 / dpi[0]
+        page_h = height * 72.0 / dpi[1]
+        content = f"q\n{page_w:.4f} 0 0 {page_h:.4f} 0 0 cm\n/Im0 Do\nQ\n".encode("ascii")
+        content_obj = self._alloc()
+        self._write_stream(content_obj, "", content)
+
+        page_obj = self._alloc()
+        rotate_entry = f"/Rotate {rotate} " if rotate else ""
+        self._write_object(
+            page_obj,
+            f"<< /Type /Page /Parent {self.PAGES} 0 R /MediaBox [0 0 {page_w:.4f} {page_h:.4f}] {rotate_entry}"
+            f"/Resources << /XObject << /Im0 {image_obj} 0 R >> >> /Contents {content_obj} 0 R >>",
+        )
+        self._kids.append(page_obj)
+
+    def close(self):
+        """Write page tree, catalog, xref and trailer."""
+        kids = " ".join(f"{k} 0 R" for k in self._kids)
+        self._write_object(self.PAGES, f"<< /Type /Pages /Kids [{kids}] /Count {len(self._kids)} >>")
+        self._write_object(self.CATALOG, f"<< /Type /Catalog /Pages {self.PAGES} 0 R >>")
+
+        size = self._next_obj
+        xref_offset = self.fp.tell()
+        lines = [f"xref\n0 {size}\n", "0000000000 65535 f \n"]
+        for num in range(1, size):
+            lines.append(f"{self._offsets[num]:010d} 00000 n \n")
+        lines.append(f"trailer\n<< /Size {size} /Root {self.CATALOG} 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n")
+        self.fp.write("".join(lines).encode("ascii"))
+
+    # Object output
+
+    def _alloc(self):
+        num = self._next_obj
+        self._next_obj += 1
+        return num
+
+    def _write_object(self, num, body):
+        self._offsets[num] = self.fp.tell()
+        self.fp.write(f"{num} 0 obj\n{body}\nendobj\n".encode("ascii"))
+
+    def _write_stream(self, num, entries, stream):
+        self._offsets[num] = self.fp.tell()
+        self.fp.write(f"{num} 0 obj\n<< {entries} /Length {len(stream)} >>\nstream\n".encode("ascii"))
+        self.fp.write(stream)
+        self.fp.write(b"\nendstream\nendobj\n")
+
+    # Image encoding
+
+    @staticmethod
+    def _image_object(data):
+        """Return (dict entries, stream bytes, width, height, dpi, page rotation) for an image file."""
+        # Imported here so loading the writer stays cheap
+        from PIL import Image
+        im = Image.open(io.BytesIO(data))
+        width, height = im.size
+        dpi = PdfWriter._dpi(im)
+        rotate = _ROTATIONS.get(im.getexif().get(_EXIF_ORIENTATION), 0)
+
+        if im.format == "JPEG" and im.mode in ("L", "RGB", "CMYK"):
+            # JPEG passthrough
+            colorspace = {"L": "/DeviceGray", "RGB": "/DeviceRGB", "CMYK": "/DeviceCMYK"}[im.mode]
+            entries = PdfWriter._image_entries(width, height, colorspace, "/DCTDecode")
+            if im.mode == "CMYK" and "adobe" in im.info:
+                # Photoshop writes inverted CMYK JPEGs
+                entries += " /Decode [1 0 1 0 1 0 1 0]"
+            return entries, data, width, height, dpi, rotate
+
+        if im.format == "PNG":
+            passthrough = PdfWriter._png_passthrough(data)
+            if passthrough:
+                return passthrough + (width, height, dpi, rotate)
+
+        # Everything else is decoded and stored as Flate-compressed pixels
+        im.seek(0)
+        if im.mode in ("RGBA", "LA", "PA") or (im.mode == "P" and "transparency" in im.info):
+            # PDF images have no alpha here; flatten onto white
+            im = im.convert("RGBA")
+            background = Image.new("RGB", im.size, (255, 255, 255))
+            background.paste(im, mask=im.getchannel("A"))
+            im = background
+        elif im.mode in ("1", "L"):
+            im = im.convert("L")
+        elif im.mode != "RGB":
+            im = im.convert("RGB")
+
+        colorspace = "/DeviceGray" if im.mode == "L" else "/DeviceRGB"
+        entries = PdfWriter._image_entries(width, height, colorspace, "/FlateDecode")
+        return entries, zlib.compress(im.tobytes(), 6), width, height, dpi, rotate
+
+    @staticmethod
+    def _png_passthrough(data):
+        """
+        Embed the IDAT stream of a non-interlaced 8-bit gray/RGB PNG directly
+        (PDF understands PNG predictors), or return None if it needs decoding.
+        """
+        if not data.startswith(_PNG_SIGNATURE):
+            return None
+        pos = len(_PNG_SIGNATURE)
+        idat = []
+        header = None
+        while pos + 8 <= len(data):
+            length, chunk_type = struct.unpack(">I4s", data[pos:pos + 8])
+            body = data[pos + 8:pos + 8 + length]
+            if chunk_type == b"IHDR":
+                header = struct.unpack(">IIBBBBB", body)
+            elif chunk_type == b"IDAT":
+                idat.append(body)
+            elif chunk_type == b"tRNS":
+                return None
+            elif chunk_type == b"IEND":
+                break
+            pos += 12 + length
+
+        if not header or not idat:
+            return None
+        width, height, bit_depth, color_type, _, _, interlace = header
+        if bit_depth != 8 or interlace != 0 or color_type not in (0, 2):
+            return None
+
+        colors = 1 if color_type == 0 else 3
+        colorspace = "/DeviceGray" if colors == 1 else "/DeviceRGB"
+        entries = PdfWriter._image_entries(width, height, colorspace, "/FlateDecode")
+        entries += f" /DecodeParms << /Predictor 15 /Colors {colors} /BitsPerComponent 8 /Columns {width} >>"
+        return entries, b"".join(idat)
+
+    @staticmethod
+    def _image_entries(width, height, colorspace, filter_name):
+        return (f"/Type /XObject /Subtype /Image /Width {width} /Height {height} "
+                f"/ColorSpace {colorspace} /BitsPerComponent 8 /Filter {filter_name}")
+
+    @staticmethod
+    def _dpi(im):
+        dpi = im.info.get("dpi")
+        try:
+            x, y = float(dpi[0]), float(dpi[1])
+        except (TypeError, ValueError, IndexError):
+            return _DEFAULT_DPI, _DEFAULT_DPI
+        if x <= 1 or y <= 1:
+            return _DEFAULT_DPI, _DEFAULT_DPI
+        return x, y
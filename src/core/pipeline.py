@@ -0,0 +1,203 @@
+import queue
+import threading
+from collections import deque
+from typing import NamedTuple
+
+from src.core.page_source import Page
+
+# Staged page pipeline. Every create/convert/extract runs as
+#
+#     reader thread  ->  transform (image processes, compress threads)  ->  writer
+#
+# The reader reads (and for archives decompresses) pages ahead of the rest on
+# its own thread, so on slow or network storage the CPU stages never wait for a
+# read and the reads never wait for compression. The transform stages are the
+# existing bounded pools (ImageProcessor.pages, ArchiveManager._write_zip_pages),
+# and the writer is the caller's thread. Between reader and transform at most
+# `depth` pages and `buffer_size` bytes are held.
+#
+# With several target formats the writer stage fans out (fan_out): each writer
+# runs on its own thread behind its own bounded queue and every page is read
+# (and processed) once for all of them.
+#
+# Jobs can be stopped midway: the page loops check an optional cancel Event
+# (check_cancel) and raise Cancelled. Outputs are only renamed into place when
+# complete, so a stopped job leaves nothing half-written behind.
+
+
+class PipelineConfig(NamedTuple):
+    """Read-ahead limits. depth 0 reads every page on the consumer's thread (no reader stage)."""
+    depth: int = 8
+    buffer_size: int = 64 * 1024 ** 2
+
+
+DEFAULT_PIPELINE = PipelineConfig()
+
+
+class Cancelled(RuntimeError):
+    """Raised by a job whose cancel event was set."""
+
+
+def check_cancel(cancel: threading.Event | None):
+    """Raise Cancelled if cancel is set (None never is)."""
+    if cancel is not None and cancel.is_set():
+        raise Cancelled("Stopped")
+
+
+def read_ahead(pages, config: PipelineConfig | None = None):
+    """
+    Iterate Page records whose data is read on a background thread, up to
+    config.depth pages / config.buffer_size bytes ahead of the consumer.
+    The yielded pages' read() returns the data already read. A read error is
+    raised when the consumer reaches that page. Stopping early stops the reader.
+    """
+    config = config or DEFAULT_PIPELINE
+    if config.depth <= 0:
+        yield from pages
+        return
+
+    reader = _Reader(pages, config)
+    try:
+        while True:
+            item = reader.get()
+            if item is None:
+                return
+            page, data = item
+            yield Page(page.name, page.size, lambda data=data: data)
+            del item, data
+    finally:
+        reader.close()
+
+
+class _Reader:
+    """Reader stage: a thread filling a queue bounded by page count and bytes."""
+
+    def __init__(self, pages, config: PipelineConfig):
+        self._config = config
+        self._items = deque()
+        self._bytes = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self._done = False
+        self._error = None
+        self._thread = threading.Thread(target=self._run, args=(pages,), name='page-reader', daemon=True)
+        self._thread.start()
+
+    def _run(self, pages):
+        try:
+            for page in pages:
+                data = page.read()
+                with self._cond:
+                    # A page bigger than the whole buffer is still let through on its own
+                    while not self._closed and self._items and (
+                            len(self._items) >= self._config.depth
+                            or self._bytes + len(data) > self._config.buffer_size):
+                        self._cond.wait()
+                    if self._closed:
+                        return
+                    self._items.append((page, data))
+                    self._bytes += len(data)
+                    self._cond.notify_all()
+                del data
+        except BaseException as e:
+            self._error = e
+        finally:
+            with self._cond:
+                self._done = True
+                self._cond.notify_all()
+
+    def get(self):
+        """Next (page, data); None at the end. Re-raises the reader's error in order."""
+        with self._cond:
+            while not self._items and not self._done:
+                self._cond.wait()
+            if self._items:
+                page, data = self._items.popleft()
+                self._bytes -= len(data)
+                self._cond.notify_all()
+                return page, data
+            if self._error is not None:
+                raise self._error
+            return None
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._items.clear()
+            self._cond.notify_all()
+        self._thread.join()
+
+
+_END = object()
+
+
+class _Failed:
+    """Queue item: the shared page stream failed with error."""
+    def __init__(self, error):
+        self.error = error
+
+
+class _Branch:
+    """One fan-out consumer: its thread, its queue and its outcome."""
+
+    def __init__(self, consume, depth):
+        self.queue = queue.Queue(maxsize=max(depth, 1))
+        self.done = threading.Event()
+        self.result = None
+        self.thread = threading.Thread(target=self._run, args=(consume,), name='page-writer', daemon=True)
+        self.thread.start()
+
+    def _run(self, consume):
+        try:
+            self.result = consume(self._pages())
+        except BaseException as e:
+            self.result = e
+        finally:
+            self.done.set()
+
+    def _pages(self):
+        while True:
+            item = self.queue.get()
+            if item is _END:
+                return
+            if isinstance(item, _Failed):
+                raise item.error
+            yield item
+
+    def put(self, item):
+        """Hand an item to the consumer; dropped once the consumer has finished (or failed)."""
+        while not self.done.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+
+def fan_out(pages, consumers, config: PipelineConfig | None = None):
+    """
+    Feed one stream of Page records to several consumers at once, every page
+    read once. Each consumer is a callable taking an iterable of pages; it runs
+    on its own thread behind a queue of config.depth pages. A failing consumer
+    doesn't stop the others; a failing page stream is raised in all of them.
+    Returns the consumers' return values, in order, with the exception instead
+    for those that raised.
+    """
+    config = config or DEFAULT_PIPELINE
+    branches = [_Branch(consume, config.depth) for consume in consumers]
+    end = _END
+    try:
+        for page in pages:
+            data = page.read()
+            shared = Page(page.name, page.size, lambda data=data: data)
+            for branch in branches:
+                branch.put(shared)
+            del data, shared
+    except BaseException as e:
+        end = _Failed(e)
+    finally:
+        for branch in branches:
+            branch.put(end)
+        for branch in branches:
+            branch.thread.join()
+    return [branch.result for branch in branches]
@@ -0,0 +1,193 @@
+import io
+import os
+import queue
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+
+import py7zr
+from py7zr.io import Py7zIO, WriterFactory
+
+# Streaming 7z reads. py7zr can only decode a solid block front to back, and
+# extracting to disk first costs a full copy of the book in scratch space. Here
+# a background thread runs the extraction with an in-memory writer factory and
+# hands every finished member over through a bounded queue, so at most `window`
+# decoded members wait in memory while the consumer writes pages out.
+#
+# py7zr decodes separate folders (solid blocks) on parallel threads, so members
+# can arrive out of page order. Members that arrive before they are asked for
+# are kept, in memory up to a budget and spilled to a temp dir beyond it.
+
+DEFAULT_WINDOW = 4
+DEFAULT_STASH_LIMIT = 64 * 1024 ** 2
+
+_DONE = object()
+
+
+class _Cancelled(Exception):
+    """Raised inside the extraction thread to stop it after close()."""
+
+
+class _Member(Py7zIO):
+    """Buffer for one member being decoded; handed to the stream when py7zr closes it."""
+
+    def __init__(self, name, stream):
+        self.name = name
+        self._stream = stream
+        self._buffer = io.BytesIO()
+        self._size = 0
+        self._delivered = False
+
+    def write(self, s):
+        self._size += len(s)
+        return self._buffer.write(s)
+
+    def read(self, size=None):
+        return self._buffer.read(size)
+
+    def seek(self, offset, whence=0):
+        return self._buffer.seek(offset, whence)
+
+    def flush(self):
+        pass
+
+    def size(self):
+        return self._size
+
+    def close(self):
+        self.deliver()
+
+    def deliver(self):
+        if not self._delivered:
+            self._delivered = True
+            data = self._buffer.getvalue()
+            self._buffer = io.BytesIO()
+            self._stream._put((self.name, data))
+
+
+class _Factory(WriterFactory):
+    def __init__(self, stream):
+        self._stream = stream
+        # Members still open on each decoding thread. py7zr < 1.1 never calls
+        # close() on them, so a member counts as finished once its thread starts the next one.
+        self._current = threading.local()
+        self._open = []
+        self._lock = threading.Lock()
+
+    def create(self, filename):
+        previous = getattr(self._current, 'member', None)
+        if previous is not None:
+            previous.deliver()
+        member = self._current.member = _Member(filename, self._stream)
+        with self._lock:
+            self._open.append(member)
+        return member
+
+    def deliver_all(self):
+        with self._lock:
+            for member in self._open:
+                member.deliver()
+
+
+class SevenZipStream:
+    """
+    Members of a 7z archive, decoded once in a background thread and read by name.
+    read() of a member that was already read (or is not in targets) raises KeyError.
+    """
+
+    def __init__(self, path: Path, targets, window: int = DEFAULT_WINDOW, stash_limit: int = DEFAULT_STASH_LIMIT):
+        self._queue = queue.Queue(maxsize=window)
+        self._closed = threading.Event()
+        self._lock = threading.Lock()
+        self._pending = set(targets)
+        self._stash = {}  # name -> bytes, or Path of the spilled member
+        self._stash_size = 0
+        self._stash_limit = stash_limit
+        self._spill_dir = None
+        self._spilled = 0
+        self._finished = False
+        self._thread = threading.Thread(target=self._run, args=(Path(path), list(targets)),
+                                        name='7z-stream', daemon=True)
+        self._thread.start()
+
+    def _run(self, path, targets):
+        try:
+            factory = _Factory(self)
+            with py7zr.SevenZipFile(path, mode='r') as zf:
+                zf.extract(targets=targets, factory=factory)
+            factory.deliver_all()
+        except _Cancelled:
+            pass
+        except BaseException as e:
+            self._put(e, cancellable=False)
+        finally:
+            self._put(_DONE, cancellable=False)
+
+    def _put(self, item, cancellable=True):
+        while not self._closed.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+        if cancellable:
+            raise _Cancelled()
+
+    def read(self, name: str) -> bytes:
+        with self._lock:
+            if name in self._stash:
+                return self._unstash(name)
+            if name not in self._pending:
+                raise KeyError(name)
+            while True:
+                if self._finished:
+                    raise KeyError(name)
+                item = self._queue.get()
+                if item is _DONE:
+                    self._finished = True
+                    continue
+                if isinstance(item, BaseException):
+                    self._finished = True
+                    raise item
+                member_name, data = item
+                self._pending.discard(member_name)
+                if member_name == name:
+                    return data
+                self._keep(member_name, data)
+
+    def _keep(self, name, data):
+        if self._stash_size + len(data) <= self._stash_limit:
+            self._stash[name] = data
+            self._stash_size += len(data)
+            return
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix='comic-utils-7z-')
+        self._spilled += 1
+        spilled = Path(self._spill_dir) / str(self._spilled)
+        spilled.write_bytes(data)
+        self._stash[name] = spilled
+
+    def _unstash(self, name):
+        data = self._stash.pop(name)
+        if isinstance(data, Path):
+            spilled = data
+            data = spilled.read_bytes()
+            os.remove(spilled)
+        else:
+            self._stash_size -= len(data)
+        return data
+
+    def close(self):
+        self._closed.set()
+        # Unblock a producer waiting on a full queue
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        self._thread.join()
+        self._stash.clear()
+        if self._spill_dir:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = None
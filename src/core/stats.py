@@ -0,0 +1,177 @@
+import json
+import time
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+# Per-stage instrumentation. A JobStats records wall time, CPU time and bytes
+# read/written for each named stage of one job (one source converted or
+# extracted); a BatchStats collects the jobs of a run, reports each finished
+# job to a callback and builds the end-of-batch summary.
+#
+# Stage times are exclusive: time spent in a nested stage (e.g. 'read' inside
+# 'write') is only counted for the inner one. Stages running on pool threads
+# are recorded too, so stage totals can add up to more than the job's wall time.
+# CPU time is the CPU of the thread running the stage.
+
+
+class _Stage:
+    """Handle yielded by JobStats.stage() to count bytes."""
+    __slots__ = ('bytes_in', 'bytes_out')
+
+    def __init__(self):
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def add(self, bytes_in=0, bytes_out=0):
+        self.bytes_in += bytes_in
+        self.bytes_out += bytes_out
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def add(self, bytes_in=0, bytes_out=0):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class JobStats:
+    """Stage totals of one job: {stage: {'wall', 'cpu', 'bytes_in', 'bytes_out', 'calls'}}."""
+
+    def __init__(self, name: str = '', enabled: bool = True):
+        self.name = name
+        self.enabled = enabled
+        self.stages = {}
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.error = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._started = None
+
+    def __enter__(self):
+        self._started = (time.perf_counter(), time.thread_time())
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # A job can be entered more than once; its times add up
+        wall, cpu = self._started
+        self.wall += time.perf_counter() - wall
+        self.cpu += time.thread_time() - cpu
+        if exc is not None:
+            self.error = str(exc)
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a stage; the yielded handle's add() counts bytes read/written."""
+        if not self.enabled:
+            yield _NULL_STAGE
+            return
+
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        handle = _Stage()
+        # [child wall, child cpu] of nested stages, subtracted from this one
+        nested = [0.0, 0.0]
+        stack.append(nested)
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        try:
+            yield handle
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.thread_time() - cpu
+            stack.pop()
+            if stack:
+                stack[-1][0] += wall
+                stack[-1][1] += cpu
+            self._add(name, wall - nested[0], cpu - nested[1], handle.bytes_in, handle.bytes_out)
+
+    def _add(self, name, wall, cpu, bytes_in, bytes_out, calls=1):
+        with self._lock:
+            s = self.stages.get(name)
+            if s is None:
+                s = self.stages[name] = {'wall': 0.0, 'cpu': 0.0, 'bytes_in': 0, 'bytes_out': 0, 'calls': 0}
+            s['wall'] += wall
+            s['cpu'] += cpu
+            s['bytes_in'] += bytes_in
+            s['bytes_out'] += bytes_out
+            s['calls'] += calls
+
+    def to_dict(self):
+        """Plain dict (picklable, JSON-able), e.g. to send back from a worker process."""
+        return {'name': self.name, 'wall': self.wall, 'cpu': self.cpu, 'error': self.error,
+                'stages': {name: dict(s) for name, s in self.stages.items()}}
+
+
+# Shared disabled instance, so instrumented code never has to check for None
+NO_STATS = JobStats(enabled=False)
+
+
+class BatchStats:
+    """
+    Collects the JobStats of a run. callback(event) is called with
+    {'event': 'job', 'name', 'wall', 'cpu', 'error', 'stages'} as each job finishes.
+    """
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.jobs = []
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def job(self, name: str):
+        """Record one job; it is added to the batch (and reported) when the block ends."""
+        job = JobStats(name)
+        try:
+            with job:
+                yield job
+        finally:
+            self.add(job.to_dict())
+
+    def add(self, job: dict):
+        """Add a finished job, as returned by JobStats.to_dict() (e.g. from a worker process)."""
+        with self._lock:
+            self.jobs.append(job)
+        if self.callback:
+            self.callback({'event': 'job', **job})
+
+    def summary(self):
+        """Totals per stage over all jobs, plus the jobs themselves."""
+        stages = {}
+        for job in self.jobs:
+            for name, s in job['stages'].items():
+                total = stages.setdefault(name, {'wall': 0.0, 'cpu': 0.0, 'bytes_in': 0, 'bytes_out': 0, 'calls': 0})
+                for key in total:
+                    total[key] += s[key]
+        return {
+            'wall': time.perf_counter() - self._started,
+            'job_count': len(self.jobs),
+            'failed': sum(1 for job in self.jobs if job['error']),
+            'job_wall': sum(job['wall'] for job in self.jobs),
+            'stages': stages,
+            'jobs': self.jobs,
+        }
+
+    def report(self):
+        """Human readable summary table, slowest stage first."""
+        summary = self.summary()
+        lines = [f"{summary['job_count']} jobs ({summary['failed']} failed) in {summary['wall']:.2f} s, "
+                 f"{summary['job_wall']:.2f} s of job time",
+                 f"{'stage':12} {'wall s':>9} {'cpu s':>9} {'share':>6} {'MB in':>9} {'MB out':>9} {'MB/s':>8} {'calls':>7}"]
+        total_wall = sum(s['wall'] for s in summary['stages'].values()) or 1.0
+        for name, s in sorted(summary['stages'].items(), key=lambda item: -item[1]['wall']):
+            moved = max(s['bytes_in'], s['bytes_out']) / 1024 ** 2
+            rate = moved / s['wall'] if s['wall'] else 0.0
+            lines.append(f"{name:12} {s['wall']:9.3f} {s['cpu']:9.3f} {s['wall'] / total_wall:6.1%} "
+                         f"{s['bytes_in'] / 1024 ** 2:9.1f} {s['bytes_out'] / 1024 ** 2:9.1f} {rate:8.1f} {s['calls']:7d}")
+        return '\n'.join(lines)
+
+    def dump(self, path: Path):
+        """Write the summary as JSON."""
+        Path(path).write_text(json.dumps(self.summary(), indent=1), encoding='utf-8')
@@ -1,4 +1,6 @@
+import os
 import re
+from itertools import count
 from pathlib import Path
 
 # Shared constants
@@ -8,6 +10,18 @@ def is_image_file(filename):
     """Check if the file has a valid image extension."""
     return Path(filename).suffix.lower() in IMAGE_EXTENSIONS
 
+def candidate_names(name: str, parent: str):
+    """
+    Names to try for a file flattened out of its folder, until one is free: its
+    own, then with the folder name as prefix, then that numbered (x_1.jpg, x_1_1.jpg, ...).
+    """
+    yield name
+    name = f"{parent}_{name}"
+    yield name
+    stem, suffix = os.path.splitext(name)
+    for n in count(1):
+        yield f"{stem}_{n}{suffix}"
+
 _number_re = re.compile(r"(\d+)")
 
 def natural_sort_key(value: str):
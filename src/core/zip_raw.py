@@ -0,0 +1,77 @@
+import struct
+import zipfile
+import zlib
+
+# Low level helpers to move already-compressed ZIP members around without
+# inflating/deflating them. zipfile has no public API for this, so these
+# work with the local file header directly.
+
+_LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+_LOCAL_HEADER_SIG = b"PK\003\004"
+_DATA_DESCRIPTOR_FLAG = 0x08
+_CHUNK_SIZE = 1 << 20
+
+
+def iter_raw_member(fp, info: zipfile.ZipInfo, chunk_size=_CHUNK_SIZE):
+    """
+    Yield the compressed bytes of a member exactly as stored in the archive.
+    fp: binary file object of the source archive (not shared with a ZipFile reader).
+    """
+    fp.seek(info.header_offset)
+    header = fp.read(_LOCAL_HEADER.size)
+    if len(header) != _LOCAL_HEADER.size or header[:4] != _LOCAL_HEADER_SIG:
+        raise zipfile.BadZipFile(f"Bad local header for {info.filename}")
+    fields = _LOCAL_HEADER.unpack(header)
+    name_len, extra_len = fields[-2], fields[-1]
+    fp.seek(name_len + extra_len, 1)
+
+    remaining = info.compress_size
+    while remaining > 0:
+        chunk = fp.read(min(chunk_size, remaining))
+        if not chunk:
+            raise zipfile.BadZipFile(f"Truncated data for {info.filename}")
+        remaining -= len(chunk)
+        yield chunk
+
+
+def write_raw_member(zf: zipfile.ZipFile, zinfo: zipfile.ZipInfo, raw_chunks):
+    """
+    Append an already-compressed member to a ZipFile opened for writing.
+    zinfo must carry compress_type, CRC, compress_size and file_size of the data.
+    """
+    if zf._writing:
+        raise ValueError("Can't write raw member while another member is open for writing")
+
+    # Same zip64 decision ZipFile.open(mode='w') makes, so headers match writestr
+    zip64 = zinfo.file_size * 1.05 > zipfile.ZIP64_LIMIT
+    if zip64 and not zf._allowZip64:
+        raise zipfile.LargeZipFile("Filesize would require ZIP64 extensions")
+
+    zinfo.flag_bits &= ~_DATA_DESCRIPTOR_FLAG
+    with zf._lock:
+        zf._writecheck(zinfo)
+        zf._didModify = True
+        zf.fp.seek(zf.start_dir)
+        zinfo.header_offset = zf.fp.tell()
+        zf.fp.write(zinfo.FileHeader(zip64))
+        written = 0
+        for chunk in raw_chunks:
+            zf.fp.write(chunk)
+            written += len(chunk)
+        if written != zinfo.compress_size:
+            raise zipfile.BadZipFile(f"Size mismatch for {zinfo.filename}")
+        zf.start_dir = zf.fp.tell()
+        zf.filelist.append(zinfo)
+        zf.NameToInfo[zinfo.filename] = zinfo
+
+
+def deflate_member(data: bytes, level=None):
+    """
+    Deflate a member the same way zipfile does for ZIP_DEFLATED (level None = zlib default).
+    Returns (crc, compressed). Safe to run on worker threads (zlib releases the GIL).
+    """
+    if level is None:
+        level = zlib.Z_DEFAULT_COMPRESSION
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    compressed = compressor.compress(data) + compressor.flush()
+    return zlib.crc32(data), compressed
@@ -1,13 +1,31 @@
-import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import nullcontext
 from pathlib import Path
-from src.core.utils import is_image_file
 from src.core.archive_manager import ArchiveManager
+from src.core.compression import DEFAULT_PRESET
+from src.core.image_processing import image_pool
+from src.core.manifest import ConversionManifest, MANIFEST_NAME, source_state
+from src.core.output_cache import content_hash
+from src.core.stats import JobStats
+from src.modules.comic_folder.scanner import SourceScanner
 
-import shutil
-import tempfile
-
-def process_directory(root_dir, output_dir=None, formats=None, process_archives=False, progress_callback=None, log_callback=None):
-    """Recursively find and process folders (and optionally archives) containing images."""
+def process_directory(root_dir, output_dir=None, formats=None, process_archives=False, progress_callback=None, log_callback=None, workers=1, compression=DEFAULT_PRESET, incremental=False, cache=None, images=None, stats=None, pipeline=None):
+    """
+    Recursively find and process folders (and optionally archives) containing images.
+    Conversion starts as soon as the first source is found; the progress total
+    grows while the directory walk goes on.
+    workers: number of processes to convert with; 1 converts everything in this process.
+    compression: 'fast', 'balanced' or 'max' entry compression for zip/cbz/epub outputs.
+    incremental: keep a manifest in the output directory (root_dir if none) and
+    skip sources whose outputs are up to date.
+    cache: optional OutputCache; archive sources converted before are served from it.
+    images: optional ImageProcessor that resizes/re-encodes every page (lossy).
+    stats: optional BatchStats; gets one job per source (plus one for the scan
+    and manifest checks) with per-stage times and bytes.
+    pipeline: optional PipelineConfig, read-ahead limits per conversion.
+    Returns a list of results, one per source and format:
+    {'source': str, 'format': str, 'output': str | None, 'error': str | None, 'skipped': bool}
+    """
     if formats is None:
         formats = ['cbz']
     # If formats is passed as string (legacy), wrap it
@@ -18,81 +36,281 @@ def process_directory(root_dir, output_dir=None, formats=None, process_archives=
         log_callback = print
 
     root_path = Path(root_dir)
-    tasks = [] # (source_path, is_archive)
-    
-    # First pass: find all folders containing images
-    for dirpath, dirnames, filenames in os.walk(root_path):
-        current_images = [f for f in filenames if is_image_file(f)]
-        if current_images:
-            tasks.append((Path(dirpath), False))
-            
-        # If process_archives is enabled, look for archives too
-        if process_archives:
-            # Archives to process as "Source Folders"
-            # We treat .zip, .rar, .cbz, etc. as sources
-            archive_exts = {'.zip', '.cbz', '.rar', '.cbr', '.7z', '.cb7', '.epub', '.mobi'}
-            for f in filenames:
-                if Path(f).suffix.lower() in archive_exts:
-                    tasks.append((Path(dirpath) / f, True))
-            
-    if not tasks:
-        log_callback(f"No folders or archives found in {root_dir}")
-        return
 
-    log_callback(f"Found {len(tasks)} items to process.")
-    
-    # Create output directory if it doesn't exist and is specified
-    if output_dir:
-        Path(output_dir).mkdir(parents=True, exist_ok=True)
+    # Incremental mode: skip sources whose outputs are still up to date
+    manifest = None
+    options = _options(compression, images)
+    if incremental:
+        manifest = ConversionManifest(Path(output_dir or root_path) / MANIFEST_NAME)
 
-    # Process each task
-    total = len(tasks) * len(formats)
+    # Sources are converted while the walk is still finding more, so the
+    # progress total grows until the scan has finished (see scanner). Outputs are
+    # written while the walk goes on, so an output directory inside the root is not walked.
+    skip = None
+    if output_dir:
+        try:
+            skip = root_path / Path(output_dir).resolve().relative_to(root_path.resolve())
+        except ValueError:
+            pass
+    scan = JobStats(f"scan {root_path}", enabled=stats is not None)
+    scanner = SourceScanner(root_path, process_archives, stats=scan, skip=skip)
     current_progress = 0
-    
-    for source_path, is_archive in tasks:
-        # Determine source name
+    results = []
+    announced = False
+    output_ready = False
+
+    def report(message):
+        if progress_callback:
+            progress_callback(current_progress, scanner.found * len(formats), message)
+
+    def check_scan():
+        nonlocal announced
+        if scanner.finished and not announced and scanner.found:
+            announced = True
+            log_callback(f"Found {scanner.found} items to process.")
+
+    def prepare(source_path, is_archive):
+        """Formats of a newly found source that still have to be built, and its manifest state."""
+        nonlocal current_progress, output_ready
+        # Create output directory if it doesn't exist and is specified
+        if output_dir and not output_ready:
+            Path(output_dir).mkdir(parents=True, exist_ok=True)
+            output_ready = True
+        if not manifest:
+            return formats, None
+
         source_name = source_path.stem if is_archive else source_path.name
-        
-        # If it's an archive, we need to extract it first to a temp dir
-        temp_source_dir = None
-        working_source = source_path
-        
+        with scan.stage('manifest'):
+            try:
+                state = source_state(source_path, is_archive)
+            except OSError as e:
+                log_callback(f"Error reading {source_name}: {e}")
+                current_progress += len(formats)
+                results.extend(_result(source_path, fmt, None, e) for fmt in formats)
+                report(f"Failed {source_name}")
+                return [], None
+            todo = []
+            for fmt in formats:
+                output_path = _output_path(source_path, is_archive, output_dir, fmt)
+                if manifest.is_up_to_date(source_path, is_archive, fmt, options, output_path, state):
+                    current_progress += 1
+                    log_callback(f"Up to date: {source_name} -> {output_path.name}")
+                    results.append(_result(source_path, fmt, output_path, None, skipped=True))
+                else:
+                    todo.append(fmt)
+        if len(todo) < len(formats):
+            report(f"Skipped up-to-date {source_name}")
+        return todo, state
+
+    def finish(task_results, is_archive, state):
+        results.extend(task_results)
+        if manifest:
+            for r in task_results:
+                if r['error'] is None:
+                    manifest.record(Path(r['source']), is_archive, r['format'], options, Path(r['output']), state)
+                else:
+                    manifest.forget(Path(r['source']), r['format'])
+
+    try:
+        if workers > 1:
+            # Parallel mode: each source is converted in a worker process. Workers can't
+            # call our callbacks, so their log lines are replayed here as each task finishes.
+            # A few tasks per worker are queued; more are taken from the scan as they finish.
+            window = workers * 2
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                running = {}
+                while True:
+                    if not scanner.finished and len(running) < window:
+                        for source_path, is_archive in scanner.poll(timeout=0.05 if running else None,
+                                                                    limit=window - len(running)):
+                            todo, state = prepare(source_path, is_archive)
+                            if todo:
+                                future = pool.submit(_run_task, source_path, is_archive, output_dir, todo, compression,
+                                                     cache, images, stats is not None, pipeline)
+                                running[future] = (source_path, is_archive, todo, state)
+                        check_scan()
+                    if not running:
+                        if scanner.finished:
+                            break
+                        continue
+
+                    keep_polling = not scanner.finished and len(running) < window
+                    done, _ = wait(running, timeout=0.05 if keep_polling else None, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        source_path, is_archive, todo, state = running.pop(future)
+                        source_name = source_path.stem if is_archive else source_path.name
+                        try:
+                            logs, task_results, job = future.result()
+                        except Exception as e:
+                            # The worker itself died (e.g. BrokenProcessPool)
+                            logs = [f"Error processing {source_name}: {e}"]
+                            task_results = [_result(source_path, fmt, None, e) for fmt in todo]
+                            job = None
+                        if stats and job:
+                            stats.add(job)
+
+                        for msg in logs:
+                            log_callback(msg)
+                        finish(task_results, is_archive, state)
+
+                        current_progress += len(todo)
+                        report(f"Processed {source_name}")
+        else:
+            # One image pool for the whole run, not one per source
+            with image_pool() if images else nullcontext() as pool:
+                while not scanner.finished:
+                    for source_path, is_archive in scanner.poll():
+                        todo, state = prepare(source_path, is_archive)
+                        if not todo:
+                            continue
+                        source_name = source_path.stem if is_archive else source_path.name
+
+                        def task_progress(fmt):
+                            nonlocal current_progress
+                            current_progress += 1
+                            report(f"Processing {source_name} -> {fmt}")
+
+                        job = JobStats(str(source_path), enabled=stats is not None)
+                        task_results = _convert_task(source_path, is_archive, output_dir, todo, log_callback,
+                                                     task_progress, compression=compression, cache=cache, images=images,
+                                                     stats=job, pipeline=pipeline, pool=pool)
+                        if stats:
+                            stats.add(job.to_dict())
+                        finish(task_results, is_archive, state)
+                    check_scan()
+    finally:
+        scanner.close()
+        if manifest:
+            manifest.save()
+        if stats:
+            stats.add(scan.to_dict())
+
+    if not scanner.found:
+        log_callback(f"No folders or archives found in {root_dir}")
+        return []
+
+    total = scanner.found * len(formats)
+    if progress_callback:
+        progress_callback(total, total, "Done")
+
+    return results
+
+def _run_task(source_path, is_archive, output_dir, formats, compression, cache, images, collect_stats, pipeline):
+    """
+    Process pool entry point: convert one source, collecting log lines for the parent.
+    Returns (logs, results, job stats dict or None).
+    """
+    logs = []
+    job = JobStats(str(source_path), enabled=collect_stats)
+    # One compression thread (and no image pool) per worker process, the pool already uses every core
+    results = _convert_task(source_path, is_archive, output_dir, formats, logs.append, threads=1,
+                            compression=compression, cache=cache, images=images, stats=job, pipeline=pipeline)
+    return logs, results, job.to_dict() if collect_stats else None
+
+def _convert_task(source_path, is_archive, output_dir, formats, log_callback, progress=None, threads=None,
+                  compression=DEFAULT_PRESET, cache=None, images=None, stats=None, pipeline=None, pool=None):
+    """
+    Convert one folder or archive to all target formats. Returns one result per format.
+    stats: optional JobStats for the whole task.
+    pool: the run's image process pool, if any.
+    """
+    stats = stats or JobStats(enabled=False)
+    with stats:
+        return _convert_formats(source_path, is_archive, output_dir, formats, log_callback, progress, threads,
+                                compression, cache, images, stats, pipeline, pool)
+
+def _convert_formats(source_path, is_archive, output_dir, formats, log_callback, progress, threads,
+                     compression, cache, images, stats, pipeline, pool):
+    # Determine source name
+    source_name = source_path.stem if is_archive else source_path.name
+    results = {}
+    outputs = {}
+    cache_keys = {}
+    digest = None
+
+    def failed(fmt, output_path, e):
+        log_callback(f"Error converting {source_name} to {fmt}: {e}")
+        results[fmt] = _result(source_path, fmt, output_path, e)
+        stats.error = stats.error or str(e)
+
+    # Resolve outputs and cache hits first, whatever is left is written in one pass
+    for fmt in formats:
+        if progress:
+            progress(fmt)
+
+        output_path = None
+        try:
+            output_path = _output_path(source_path, is_archive, output_dir, fmt)
+            if is_archive and cache:
+                with stats.stage('cache'):
+                    # The source is hashed once, every format's key derives from it
+                    if digest is None:
+                        digest = content_hash(source_path)
+                    cache_keys[fmt] = cache.key(source_path, fmt, _options(compression, images), digest)
+                    hit = cache.fetch(cache_keys[fmt], output_path)
+                if hit:
+                    log_callback(f"Cached: {source_name} -> {output_path.name}")
+                    results[fmt] = _result(source_path, fmt, output_path, None)
+                    continue
+            outputs[fmt] = output_path
+        except Exception as e:
+            failed(fmt, output_path, e)
+
+    if outputs:
+        # Every page is read once and fanned out to all target formats together
         try:
             if is_archive:
-                # Extract to temp
-                temp_source_dir = tempfile.TemporaryDirectory()
-                log_callback(f"Extracting {source_path.name}...")
-                ArchiveManager.extract_archive(source_path, Path(temp_source_dir.name))
-                working_source = Path(temp_source_dir.name)
-            
-            # Now convert to all target formats
-            for fmt in formats:
-                current_progress += 1
-                if progress_callback:
-                    progress_callback(current_progress, total, f"Processing {source_name} -> {fmt}")
-                
-                try:
-                    archive_name = source_name + '.' + fmt
-                    if output_dir:
-                        output_path = Path(output_dir) / archive_name
-                    else:
-                        output_path = source_path.parent / archive_name
-                        
-                    # Avoid overwriting source if source is same as output (e.g. zip -> zip in same folder)
-                    if output_path.resolve() == source_path.resolve():
-                        output_path = source_path.parent / (source_name + "_converted." + fmt)
-
-                    ArchiveManager.create_archive(working_source, output_path, fmt)
-                    log_callback(f"Success: {source_name} -> {output_path.name}")
-                    
-                except Exception as e:
-                    log_callback(f"Error converting {source_name} to {fmt}: {e}")
-                    
+                # Archives stream page by page into the targets, no temp extraction
+                counts = ArchiveManager.convert_archives(source_path, outputs, threads=threads, compression=compression,
+                                                         images=images, stats=stats, pipeline=pipeline, pool=pool)
+            else:
+                counts = ArchiveManager.create_archives(source_path, outputs, threads=threads, compression=compression,
+                                                        images=images, stats=stats, pipeline=pipeline, pool=pool)
         except Exception as e:
-             log_callback(f"Error preparing {source_name}: {e}")
-        finally:
-            if temp_source_dir:
-                temp_source_dir.cleanup()
+            counts = {fmt: e for fmt in outputs}
+
+        for fmt, output_path in outputs.items():
+            try:
+                if isinstance(counts[fmt], Exception):
+                    raise counts[fmt]
+                if is_archive and counts[fmt] == 0:
+                    raise ValueError("No images found in archive")
+                if fmt in cache_keys:
+                    with stats.stage('cache'):
+                        cache.store(cache_keys[fmt], output_path)
+                log_callback(f"Success: {source_name} -> {output_path.name}")
+                results[fmt] = _result(source_path, fmt, output_path, None)
+            except Exception as e:
+                failed(fmt, output_path, e)
+
+    return [results[fmt] for fmt in formats]
+
+def _output_path(source_path, is_archive, output_dir, fmt):
+    """Where a source converted to fmt is written."""
+    source_name = source_path.stem if is_archive else source_path.name
+    archive_name = source_name + '.' + fmt
+    if output_dir:
+        output_path = Path(output_dir) / archive_name
+    else:
+        output_path = source_path.parent / archive_name
         
-    if progress_callback:
-        progress_callback(total, total, "Done")
+    # Avoid overwriting source if source is same as output (e.g. zip -> zip in same folder)
+    if output_path.resolve() == source_path.resolve():
+        output_path = source_path.parent / (source_name + "_converted." + fmt)
+    return output_path
+
+def _options(compression, images):
+    """Conversion settings that change the output, as stored in manifests and cache keys."""
+    options = {'compression': compression}
+    if images:
+        options['images'] = images.options()
+    return options
+
+def _result(source_path, fmt, output_path, error, skipped=False):
+    return {
+        'source': str(source_path),
+        'format': fmt,
+        'output': str(output_path) if output_path and error is None else None,
+        'error': str(error) if error is not None else None,
+        'skipped': skipped,
+    }
@@ -0,0 +1,131 @@
+import os
+import queue
+import threading
+from contextlib import nullcontext
+from functools import partial
+from pathlib import Path
+from src.core.utils import is_image_file
+from src.core.stats import NO_STATS, JobStats
+
+# Source discovery for process_directory. On big (network) libraries a full
+# walk takes minutes, so the walk runs on a background thread and hands every
+# source over as soon as it is found; conversion starts on the first one.
+
+# Archives to process as "Source Folders"
+ARCHIVE_EXTENSIONS = {'.zip', '.cbz', '.rar', '.cbr', '.7z', '.cb7', '.epub', '.mobi', '.azw3', '.azw'}
+
+_DONE = object()
+
+
+def iter_sources(root_path: Path, process_archives: bool, stats=NO_STATS, skip: Path | None = None):
+    """
+    Yield (source_path, is_archive) in os.walk order (top-down, no symlinked
+    folders followed): every folder directly containing images, plus archives if asked.
+    Unreadable folders and the folder skip (e.g. the output directory) are left out.
+    stats: JobStats, each listing is a 'scan' stage.
+    """
+    # Plain strings while walking, Path objects only for what is yielded
+    skip = str(skip) if skip is not None else None
+    listing = partial(stats.stage, 'scan') if stats.enabled else nullcontext
+    stack = [str(root_path)]
+    while stack:
+        folder = stack.pop()
+        try:
+            with listing(), os.scandir(folder) as it:
+                entries = list(it)
+        except OSError:
+            continue
+
+        subdirs = []
+        files = []
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if is_dir:
+                if not entry.is_symlink() and entry.path != skip:
+                    subdirs.append(entry.path)
+            else:
+                files.append(entry.name)
+
+        if any(is_image_file(f) for f in files):
+            yield Path(folder), False
+        if process_archives:
+            for f in files:
+                if os.path.splitext(f)[1].lower() in ARCHIVE_EXTENSIONS:
+                    yield Path(folder, f), True
+        # Reversed so the stack pops them in listing order
+        stack.extend(reversed(subdirs))
+
+
+class SourceScanner:
+    """
+    Runs iter_sources() on a background thread. Sources wait in a bounded queue
+    until taken with poll(); found counts the sources seen so far and finished
+    turns True once the walk ended and everything was taken.
+    """
+
+    def __init__(self, root_path: Path, process_archives: bool, maxsize: int = 1024, stats=None, skip=None):
+        """
+        stats: optional JobStats; gets the walk as its wall time and every listing as a 'scan' stage.
+        skip: folder left out of the walk (see iter_sources).
+        """
+        stats = stats or JobStats(enabled=False)
+        self.found = 0
+        self.finished = False
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._closed = threading.Event()
+        self._error = None
+        self._thread = threading.Thread(target=self._run, args=(root_path, process_archives, stats, skip),
+                                        name='source-scanner', daemon=True)
+        self._thread.start()
+
+    def _run(self, root_path, process_archives, stats, skip):
+        try:
+            with stats:
+                for task in iter_sources(root_path, process_archives, stats, skip):
+                    self.found += 1
+                    if not self._put(task):
+                        return
+        except BaseException as e:
+            self._error = e
+        self._put(_DONE)
+
+    def _put(self, item):
+        while not self._closed.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def poll(self, timeout=None, limit=None):
+        """
+        Up to limit sources found so far; waits up to timeout (None: until there is
+        at least one or the walk ended) when there are none yet.
+        """
+        tasks = []
+        if self.finished:
+            return tasks
+        try:
+            item = self._queue.get(timeout=timeout)
+            while True:
+                if item is _DONE:
+                    self.finished = True
+                    if self._error is not None:
+                        raise self._error
+                    break
+                tasks.append(item)
+                if limit and len(tasks) >= limit:
+                    break
+                item = self._queue.get_nowait()
+        except queue.Empty:
+            pass
+        return tasks
+
+    def close(self):
+        """Stop the walk (if still running) and wait for the thread."""
+        self._closed.set()
+        self._thread.join()
@@ -1,37 +1,67 @@
-import shutil
-import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from src.core.utils import natural_sort_key, IMAGE_EXTENSIONS
 from src.core.archive_manager import ArchiveManager
+from src.core.compression import DEFAULT_PRESET
+from src.core.output_cache import OutputCache
+from src.core.image_processing import ImageProcessor
+from src.core.stats import NO_STATS, JobStats
+from src.core.pipeline import PipelineConfig
+from src.core.pdf_render import PdfRenderer
 
 class ConvertError(RuntimeError):
   pass
 
-def convert_ebook(input_path: Path, output_dir: Path | None = None, fmt: str = 'cbz') -> Path:
+def convert_ebook(input_path: Path, output_dir: Path | None = None, fmt: str = 'cbz',
+                  compression: str = DEFAULT_PRESET, cache: OutputCache | None = None,
+                  images: ImageProcessor | None = None, stats: JobStats | None = None,
+                  pipeline: PipelineConfig | None = None, pdf_render: PdfRenderer | None = None,
+                  threads: int | None = None, pool: ProcessPoolExecutor | None = None,
+                  cancel: threading.Event | None = None) -> Path:
+  """
+  Convert an archive/ebook into fmt next to it (or in output_dir). Returns the output path.
+  threads: compression threads and PDF render processes (default: one per CPU)
+  pool: the batch's image process pool (see image_processing.image_pool)
+  cancel: optional Event; once set, the conversion stops with pipeline.Cancelled
+  """
+  stats = stats or NO_STATS
   if not input_path.exists():
     raise ConvertError(f"File not found: {input_path}")
 
-  # Temporary extraction
-  with tempfile.TemporaryDirectory() as temp_dir:
-      temp_path = Path(temp_dir)
-      
-      # Extract images from input (reuse extract logic or custom ebook logic)
-      # For now, we reuse the specialized logic for epub/mobi image extraction 
-      # but we need to put them in a clean folder for ArchiveManager to consume
-      
-      images_dir = temp_path / "images"
-      images_dir.mkdir()
-      
-      count = ArchiveManager.extract_archive(input_path, images_dir)
-      
-      if count == 0:
-          raise ConvertError("No images found in ebook.")
-          
-      # Now create output archive
-      output_dir = (output_dir or input_path.parent).resolve()
-      output_dir.mkdir(parents=True, exist_ok=True)
-      output_path = output_dir / f"{input_path.stem}.{fmt}"
-      
-      ArchiveManager.create_archive(images_dir, output_path, fmt)
-      
-      return output_path
+  output_dir = (output_dir or input_path.parent).resolve()
+  output_dir.mkdir(parents=True, exist_ok=True)
+  output_path = output_dir / f"{input_path.stem}.{fmt}"
+  # The source is read while the target is written, so never write over it
+  if output_path.resolve() == input_path.resolve():
+      output_path = output_dir / f"{input_path.stem}_converted.{fmt}"
+
+  # Same content converted before with the same options: reuse that output
+  cache_key = None
+  if cache:
+      options = {'compression': compression}
+      if images:
+          options['images'] = images.options()
+      if pdf_render and input_path.suffix.lower() == '.pdf':
+          options['pdf_render'] = pdf_render.options()
+      with stats.stage('cache') as cached:
+          cache_key = cache.key(input_path, fmt, options)
+          hit = cache.fetch(cache_key, output_path)
+          cached.add(bytes_in=input_path.stat().st_size)
+      if hit:
+          return output_path
+
+  # Pages stream straight from the source reader into the target writer,
+  # one at a time, without an intermediate extraction folder (resized on the way if asked)
+  count = ArchiveManager.convert_archive(input_path, output_path, fmt, threads=threads, compression=compression,
+                                         images=images, stats=stats, pipeline=pipeline, pdf_render=pdf_render,
+                                         pool=pool, cancel=cancel)
+
+  if count == 0:
+      raise ConvertError("No images found in ebook.")
+
+  if cache:
+      with stats.stage('cache'):
+          cache.store(cache_key, output_path)
+
+  return output_path
@@ -4,11 +4,14 @@ import threading
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QGroupBox, QLabel, 
     QLineEdit, QPushButton, QCheckBox, QProgressBar, QTextEdit, QFileDialog, QGridLayout,
-    QRadioButton, QButtonGroup
+    QRadioButton, QButtonGroup, QComboBox
 )
 from PyQt6.QtCore import Qt, pyqtSignal, QObject
 
 from src.modules.comic_folder import converter
+from src.core.compression import PRESETS, DEFAULT_PRESET
+from src.core.output_cache import OutputCache
+from src.core.image_processing import DEVICE_PROFILES, device_processor
 from src.core.i18n import i18n
 
 class LogSignal(QObject):
@@ -84,9 +87,35 @@ class ComicFolderTab(QWidget):
         
         self.layout.addWidget(self.fmt_group)
         
+        # Compression preset (zip/cbz/epub)
+        comp_layout = QHBoxLayout()
+        self.lbl_compression = QLabel(i18n.get('compression_label'))
+        self.combo_compression = QComboBox()
+        for preset in PRESETS:
+            self.combo_compression.addItem(i18n.get(f'comp_{preset}'), preset)
+        self.combo_compression.setCurrentIndex(self.combo_compression.findData(DEFAULT_PRESET))
+        comp_layout.addWidget(self.lbl_compression)
+        comp_layout.addWidget(self.combo_compression)
+        
+        # Target device: pages are downscaled to fit its screen (lossy)
+        self.lbl_device = QLabel(i18n.get('device_label'))
+        self.combo_device = QComboBox()
+        self.combo_device.addItem(i18n.get('device_original'), None)
+        for profile in DEVICE_PROFILES:
+            self.combo_device.addItem(profile, profile)
+        comp_layout.addWidget(self.lbl_device)
+        comp_layout.addWidget(self.combo_device)
+        self.chk_eink = QCheckBox(i18n.get('chk_eink'))
+        comp_layout.addWidget(self.chk_eink)
+        comp_layout.addStretch()
+        self.layout.addLayout(comp_layout)
+        
         # Recursive / Process Archives option
         self.chk_process_archives = QCheckBox(i18n.get('chk_recursive'))
         self.layout.addWidget(self.chk_process_archives)
+        # Opt-in: every archive is hashed in full to look it up
+        self.chk_cache = QCheckBox(i18n.get('chk_cache'))
+        self.layout.addWidget(self.chk_cache)
         
         # Drag Drop Hint
         self.lbl_hint = QLabel(i18n.get('drag_drop_hint'))
@@ -125,8 +154,15 @@ class ComicFolderTab(QWidget):
         self.output_group.setTitle(i18n.get('output_dir'))
         self.btn_browse_output.setText(i18n.get('browse'))
         self.fmt_group.setTitle(i18n.get('format_label'))
+        self.lbl_compression.setText(i18n.get('compression_label'))
+        for i in range(self.combo_compression.count()):
+            self.combo_compression.setItemText(i, i18n.get(f"comp_{self.combo_compression.itemData(i)}"))
+        self.lbl_device.setText(i18n.get('device_label'))
+        self.combo_device.setItemText(0, i18n.get('device_original'))
+        self.chk_eink.setText(i18n.get('chk_eink'))
         self.lbl_hint.setText(i18n.get('drag_drop_hint'))
         self.chk_process_archives.setText(i18n.get('chk_recursive'))
+        self.chk_cache.setText(i18n.get('chk_cache'))
         self.start_btn.setText(i18n.get('start'))
         self.log_group.setTitle(i18n.get('log'))
         
@@ -175,6 +211,9 @@ class ComicFolderTab(QWidget):
             selected_formats = []
             
         process_archives = self.chk_process_archives.isChecked()
+        use_cache = process_archives and self.chk_cache.isChecked()
+        compression = self.combo_compression.currentData()
+        images = device_processor(self.combo_device.currentData(), self.chk_eink.isChecked())
         
         if not input_dir:
             self.log(i18n.get('select_input'))
@@ -195,9 +234,9 @@ class ComicFolderTab(QWidget):
         self.log(f"{i18n.get('processing')}\nInput: {input_dir}\nOutput: {output_dir}\nFormats: {', '.join(selected_formats)}\nProcess Archives: {process_archives}\n")
         
         # Run in thread
-        threading.Thread(target=self.run_conversion, args=(input_dir, output_dir, selected_formats, process_archives), daemon=True).start()
+        threading.Thread(target=self.run_conversion, args=(input_dir, output_dir, selected_formats, process_archives, compression, images, use_cache), daemon=True).start()
 
-    def run_conversion(self, input_dir, output_dir, formats, process_archives):
+    def run_conversion(self, input_dir, output_dir, formats, process_archives, compression, images, use_cache):
         try:
             target_output = output_dir if output_dir.strip() else None
             
@@ -213,6 +252,9 @@ class ComicFolderTab(QWidget):
                 target_output, 
                 formats=formats,
                 process_archives=process_archives,
+                compression=compression,
+                cache=OutputCache() if use_cache else None,
+                images=images,
                 progress_callback=progress_cb,
                 log_callback=log_cb
             )
@@ -3,65 +3,111 @@ import threading
 import sys
 import os
 import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
 from pathlib import Path
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QGroupBox, QLabel, 
     QLineEdit, QPushButton, QTableWidget, QTableWidgetItem, QHeaderView,
-    QComboBox, QProgressBar, QFileDialog, QMessageBox, QAbstractItemView
+    QComboBox, QProgressBar, QFileDialog, QMessageBox, QAbstractItemView, QCheckBox
 )
 from PyQt6.QtCore import Qt, pyqtSignal, QObject
 
 from src.modules.ebook_to_cbz.converter import ConvertError, convert_ebook
+from src.core.pipeline import Cancelled
+from src.core.compression import PRESETS, DEFAULT_PRESET
+from src.core.output_cache import OutputCache
+from src.core.image_processing import DEVICE_PROFILES, device_processor, image_pool
 from src.core.i18n import i18n
 
+# How many files are converted at the same time
+MAX_JOBS = min(4, os.cpu_count() or 1)
+
 class EbookWorker(QObject):
     progress_update = pyqtSignal(int, int, int, int) # done, total, ok, fail
     item_status = pyqtSignal(int, str) # row_idx, status
     finished = pyqtSignal()
     
-    def __init__(self, items, out_dir, fmt):
+    def __init__(self, items, out_dir, fmt, max_jobs=MAX_JOBS, compression=DEFAULT_PRESET, images=None, cancel=None,
+                 cache=None):
         super().__init__()
         self.items = items
         self.out_dir = out_dir
         self.fmt = fmt
-        self.running = True
+        self.compression = compression
+        self.images = images
+        # Optional OutputCache: re-dropped or duplicate files are served from it
+        self.cache = cache
+        self.max_jobs = max(1, max_jobs)
+        # Set by stop() (or by whoever passed it in); checked between pages of the running rows
+        self.cancel = cancel or threading.Event()
+        self._futures = []
 
     def run(self):
         ok_count = 0
         fail_count = 0
+        done = 0
         total = len(self.items)
         
-        for idx, (path_str, _) in enumerate(self.items):
-            if not self.running:
-                break
-                
-            p = Path(path_str)
-            
-            # Check if source and target formats are the same
-            src_ext = p.suffix.lower().lstrip('.')
-            target_ext = self.fmt.lower().lstrip('.')
-            
-            if src_ext == target_ext:
-                self.item_status.emit(idx, i18n.get('status_skipped', 'Skipped'))
-                ok_count += 1 # Count as success or just ignore? User probably wants to know it's done.
-                self.progress_update.emit(idx + 1, total, ok_count, fail_count)
-                continue
+        # Rows are converted by a small pool and reported as they finish, in any order.
+        # They share one image process pool, and split the cores for PDF rendering.
+        self._threads = max(1, (os.cpu_count() or 1) // self.max_jobs)
+        with image_pool() if self.images else nullcontext() as self._image_pool, \
+                ThreadPoolExecutor(max_workers=self.max_jobs) as pool:
+            futures = {}
+            for idx, (path_str, _) in enumerate(self.items):
+                futures[pool.submit(self._convert_one, idx, Path(path_str))] = idx
+            self._futures = list(futures)
+            if self.cancel.is_set():
+                self.stop()
 
-            self.item_status.emit(idx, i18n.get('status_converting'))
-            
-            try:
-                convert_ebook(p, self.out_dir, self.fmt)
-                self.item_status.emit(idx, i18n.get('status_success'))
-                ok_count += 1
-            except Exception as e:
-                print(f"Error converting {p}: {e}")
-                self.item_status.emit(idx, i18n.get('status_failed'))
-                fail_count += 1
-            
-            self.progress_update.emit(idx + 1, total, ok_count, fail_count)
+            for future in as_completed(futures):
+                idx = futures[future]
+                if future.cancelled() or future.result() is None:
+                    self.item_status.emit(idx, i18n.get('status_stopped'))
+                    continue
+
+                status = future.result()
+                done += 1
+                if status == 'status_failed':
+                    fail_count += 1
+                else:
+                    ok_count += 1 # Skipped counts as success, user probably wants to know it's done.
+                self.item_status.emit(idx, i18n.get(status))
+                self.progress_update.emit(done, total, ok_count, fail_count)
             
         self.finished.emit()
 
+    def _convert_one(self, idx, p):
+        """Runs on a pool thread. Returns the i18n status key, or None if stopped."""
+        if self.cancel.is_set():
+            return None
+
+        # Check if source and target formats are the same
+        src_ext = p.suffix.lower().lstrip('.')
+        target_ext = self.fmt.lower().lstrip('.')
+        
+        if src_ext == target_ext and not self.images:
+            return 'status_skipped'
+
+        self.item_status.emit(idx, i18n.get('status_converting'))
+        
+        try:
+            convert_ebook(p, self.out_dir, self.fmt, compression=self.compression, cache=self.cache,
+                          images=self.images, threads=self._threads, pool=self._image_pool, cancel=self.cancel)
+            return 'status_success'
+        except Cancelled:
+            return None
+        except Exception as e:
+            print(f"Error converting {p}: {e}")
+            return 'status_failed'
+
+    def stop(self):
+        # Queued rows are dropped; rows already converting stop at their next page
+        self.cancel.set()
+        for future in self._futures:
+            future.cancel()
+
 class EbookTab(QWidget):
     def __init__(self):
         super().__init__()
@@ -137,6 +183,33 @@ class EbookTab(QWidget):
         self.combo_format.addItems(["cbz", "zip", "pdf", "epub", "7z"])
         right_layout.addWidget(self.combo_format)
         
+        # Compression preset (zip/cbz/epub)
+        self.lbl_compression = QLabel(i18n.get('compression_label'))
+        right_layout.addWidget(self.lbl_compression)
+        
+        self.combo_compression = QComboBox()
+        for preset in PRESETS:
+            self.combo_compression.addItem(i18n.get(f'comp_{preset}'), preset)
+        self.combo_compression.setCurrentIndex(self.combo_compression.findData(DEFAULT_PRESET))
+        right_layout.addWidget(self.combo_compression)
+        
+        # Target device: pages are downscaled to fit its screen (lossy)
+        self.lbl_device = QLabel(i18n.get('device_label'))
+        right_layout.addWidget(self.lbl_device)
+        
+        self.combo_device = QComboBox()
+        self.combo_device.addItem(i18n.get('device_original'), None)
+        for profile in DEVICE_PROFILES:
+            self.combo_device.addItem(profile, profile)
+        right_layout.addWidget(self.combo_device)
+        
+        self.chk_eink = QCheckBox(i18n.get('chk_eink'))
+        right_layout.addWidget(self.chk_eink)
+
+        # Opt-in: every file is hashed in full to look it up
+        self.chk_cache = QCheckBox(i18n.get('chk_cache'))
+        right_layout.addWidget(self.chk_cache)
+        
         right_layout.addStretch()
         
         self.lbl_hint = QLabel(i18n.get('drag_drop_hint'))
@@ -150,6 +223,11 @@ class EbookTab(QWidget):
         self.btn_start.setMinimumHeight(40)
         # Style logic handled in MainWindow
         right_layout.addWidget(self.btn_start)
+
+        self.btn_stop = QPushButton(i18n.get('stop'))
+        self.btn_stop.clicked.connect(self.stop_convert)
+        self.btn_stop.setEnabled(False)
+        right_layout.addWidget(self.btn_stop)
         
         right_layout.addStretch()
         
@@ -174,8 +252,16 @@ class EbookTab(QWidget):
         self.btn_remove.setText(i18n.get('remove_selected'))
         self.btn_clear.setText(i18n.get('clear_list'))
         self.lbl_format.setText(i18n.get('format_label'))
+        self.lbl_compression.setText(i18n.get('compression_label'))
+        for i in range(self.combo_compression.count()):
+            self.combo_compression.setItemText(i, i18n.get(f"comp_{self.combo_compression.itemData(i)}"))
+        self.lbl_device.setText(i18n.get('device_label'))
+        self.combo_device.setItemText(0, i18n.get('device_original'))
+        self.chk_eink.setText(i18n.get('chk_eink'))
+        self.chk_cache.setText(i18n.get('chk_cache'))
         self.lbl_hint.setText(i18n.get('drag_drop_hint'))
         self.btn_start.setText(i18n.get('start'))
+        self.btn_stop.setText(i18n.get('stop'))
         
         if not self.is_working:
             self.status_label.setText(i18n.get('ready'))
@@ -198,7 +284,7 @@ class EbookTab(QWidget):
             self, 
             i18n.get('add_files'), 
             "", 
-            "Ebooks (*.epub *.mobi *.pdf *.cbz *.cbr *.zip *.rar *.7z);;All Files (*.*)"
+            "Ebooks (*.epub *.mobi *.azw3 *.azw *.pdf *.cbz *.cbr *.zip *.rar *.7z);;All Files (*.*)"
         )
         for p in files:
             self.add_file_to_list(p)
@@ -267,6 +353,7 @@ class EbookTab(QWidget):
         out_dir.mkdir(parents=True, exist_ok=True)
 
         self.is_working = True
+        self.cancel = threading.Event()
         self.toggle_inputs(False)
         self.progress.setMaximum(count)
         self.progress.setValue(0)
@@ -278,18 +365,21 @@ class EbookTab(QWidget):
             items.append((self.table.item(row, 0).text(), row))
             self.table.setItem(row, 2, QTableWidgetItem(i18n.get('status_pending')))
             
-        self.worker_thread = threading.Thread(target=self._run_worker, args=(items, out_dir, fmt))
+        images = device_processor(self.combo_device.currentData(), self.chk_eink.isChecked())
+        cache = OutputCache() if self.chk_cache.isChecked() else None
+        self.worker_thread = threading.Thread(target=self._run_worker, args=(items, out_dir, fmt, self.combo_compression.currentData(), images, cache))
         self.worker_thread.daemon = True
         self.worker_thread.start()
         
-    def _run_worker(self, items, out_dir, fmt):
+    def _run_worker(self, items, out_dir, fmt, compression, images, cache):
         # We need a QObject to emit signals, but we can't create QWidgets in thread
         # So we use the approach of creating a worker object in the main thread and moving it? 
         # Or just use the signals defined in this class? 
         # Actually simplest is to define a Signal carrier class or use self signals with `emit` from thread (PyQt allows emitting signals from threads)
         
         # Re-using the logic, but adapted for thread safety
-        worker = EbookWorker(items, out_dir, fmt)
+        worker = EbookWorker(items, out_dir, fmt, compression=compression, images=images, cancel=self.cancel,
+                             cache=cache)
         worker.progress_update.connect(self._on_progress)
         worker.item_status.connect(self._on_item_status)
         worker.finished.connect(self._on_finished)
@@ -308,7 +398,14 @@ class EbookTab(QWidget):
         self.toggle_inputs(True)
         QMessageBox.information(self, i18n.get('msg_done_title'), i18n.get('done'))
 
+    def stop_convert(self):
+        # The worker picks it up before its next row or page
+        if self.is_working:
+            self.cancel.set()
+            self.btn_stop.setEnabled(False)
+
     def toggle_inputs(self, enable):
+        self.btn_stop.setEnabled(not enable)
         self.btn_add.setEnabled(enable)
         self.btn_remove.setEnabled(enable)
         self.btn_clear.setEnabled(enable)
@@ -316,3 +413,7 @@ class EbookTab(QWidget):
         self.entry_output.setEnabled(enable)
         self.btn_select.setEnabled(enable)
         self.combo_format.setEnabled(enable)
+        self.combo_compression.setEnabled(enable)
+        self.combo_device.setEnabled(enable)
+        self.chk_eink.setEnabled(enable)
+        self.chk_cache.setEnabled(enable)
@@ -1,7 +1,9 @@
 import sys
 import os
+import threading
 from pathlib import Path
 import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton,
@@ -12,8 +14,12 @@ from PyQt6.QtCore import Qt, QThread, pyqtSignal, QObject
 from PyQt6.QtGui import QDragEnterEvent, QDropEvent
 
 from src.core.archive_manager import ArchiveManager
+from src.core.pipeline import Cancelled
 from src.core.i18n import i18n
 
+# How many archives are extracted at the same time
+MAX_JOBS = min(4, os.cpu_count() or 1)
+
 class ExtractWorker(QObject):
     # done, total, ok, fail
     progress_update = pyqtSignal(int, int, int, int)
@@ -22,51 +28,86 @@ class ExtractWorker(QObject):
     # ok_count, fail_count, last_error
     finished = pyqtSignal(int, int, str)
 
-    def __init__(self, items, out_dir):
+    def __init__(self, items, out_dir, max_jobs=MAX_JOBS, cancel=None):
         super().__init__()
         self.items = items
         self.out_dir = Path(out_dir)
-        self.running = True
+        self.max_jobs = max(1, max_jobs)
+        # Set by stop() (or by whoever passed it in); checked between pages of the running rows
+        self.cancel = cancel or threading.Event()
+        self._futures = []
 
     def run(self):
         ok = 0
         fail = 0
+        done = 0
         last_error = ""
         total = len(self.items)
 
-        for idx, (path_str, _) in enumerate(self.items):
-            if not self.running:
-                break
-            
-            p = Path(path_str)
-            self.item_status.emit(idx, i18n.get('status_extracting'))
+        # Rows are extracted by a small pool and reported as they finish, in any order
+        with ThreadPoolExecutor(max_workers=self.max_jobs) as pool:
+            futures = {}
+            for idx, (path_str, _) in enumerate(self.items):
+                futures[pool.submit(self._extract_one, idx, Path(path_str))] = idx
+            self._futures = list(futures)
+            if self.cancel.is_set():
+                self.stop()
 
-            try:
-                # Create a subfolder for each archive
-                archive_name = p.stem
-                target_dir = self.out_dir / archive_name
-                
-                # Ensure ArchiveManager.extract_archive is thread-safe or doesn't touch UI
-                count = ArchiveManager.extract_archive(p, target_dir)
-                
-                if count > 0:
+            for future in as_completed(futures):
+                idx = futures[future]
+                if future.cancelled():
+                    self.item_status.emit(idx, i18n.get('status_stopped'))
+                    continue
+
+                result = future.result()
+                if result is None:
+                    # Stopped before it started, or midway
+                    self.item_status.emit(idx, i18n.get('status_stopped'))
+                    continue
+
+                success, error = result
+                done += 1
+                if success:
                     ok += 1
                     self.item_status.emit(idx, i18n.get('status_success'))
                 else:
                     fail += 1
-                    last_error = "No images extracted"
+                    last_error = error
                     self.item_status.emit(idx, i18n.get('status_failed'))
-            except Exception as e:
-                fail += 1
-                last_error = str(e)
-                self.item_status.emit(idx, i18n.get('status_failed'))
-            
-            self.progress_update.emit(idx + 1, total, ok, fail)
+                
+                self.progress_update.emit(done, total, ok, fail)
 
         self.finished.emit(ok, fail, last_error)
 
+    def _extract_one(self, idx, p):
+        """Runs on a pool thread. Returns (success, error), or None if stopped."""
+        if self.cancel.is_set():
+            return None
+        self.item_status.emit(idx, i18n.get('status_extracting'))
+
+        try:
+            # Create a subfolder for each archive
+            archive_name = p.stem
+            target_dir = self.out_dir / archive_name
+            
+            # Ensure ArchiveManager.extract_archive is thread-safe or doesn't touch UI
+            # Rows running side by side split the cores for big PDFs
+            workers = max(1, (os.cpu_count() or 1) // self.max_jobs)
+            count = ArchiveManager.extract_archive(p, target_dir, workers=workers, cancel=self.cancel)
+            
+            if count > 0:
+                return True, ""
+            return False, "No images extracted"
+        except Cancelled:
+            return None
+        except Exception as e:
+            return False, str(e)
+
     def stop(self):
-        self.running = False
+        # Queued rows are dropped; rows already extracting stop at their next page
+        self.cancel.set()
+        for future in self._futures:
+            future.cancel()
 
 class ExtractTab(QWidget):
     def __init__(self, parent=None):
@@ -144,6 +185,11 @@ class ExtractTab(QWidget):
         btn_layout.addWidget(self.lbl_hint)
         btn_layout.addSpacing(20)
         btn_layout.addWidget(self.btn_start)
+
+        self.btn_stop = QPushButton()
+        self.btn_stop.clicked.connect(self.stop_extract)
+        self.btn_stop.setEnabled(False)
+        btn_layout.addWidget(self.btn_stop)
         
         mid_layout.addLayout(btn_layout)
         layout.addLayout(mid_layout)
@@ -169,6 +215,7 @@ class ExtractTab(QWidget):
         self.btn_remove.setText(i18n.get('remove_selected'))
         self.btn_clear.setText(i18n.get('clear_list'))
         self.btn_start.setText(i18n.get('start'))
+        self.btn_stop.setText(i18n.get('stop'))
         self.lbl_hint.setText(i18n.get('drag_drop_hint'))
         
         if not self.is_working:
@@ -183,7 +230,7 @@ class ExtractTab(QWidget):
             path = url.toLocalFile()
             if os.path.isfile(path):
                 ext = Path(path).suffix.lower()
-                if ext in ['.epub', '.mobi', '.zip', '.cbz', '.rar', '.cbr', '.pdf', '.7z', '.cb7']:
+                if ext in ['.epub', '.mobi', '.azw3', '.azw', '.zip', '.cbz', '.rar', '.cbr', '.pdf', '.7z', '.cb7']:
                     self.add_file_to_list(path)
 
     def choose_output(self):
@@ -210,7 +257,7 @@ class ExtractTab(QWidget):
             self, 
             i18n.get('add_files'), 
             "", 
-            "Archives (*.epub *.mobi *.zip *.cbz *.rar *.cbr *.pdf *.7z *.cb7);;All Files (*.*)"
+            "Archives (*.epub *.mobi *.azw3 *.azw *.zip *.cbz *.rar *.cbr *.pdf *.7z *.cb7);;All Files (*.*)"
         )
         for p in files:
             self.add_file_to_list(p)
@@ -266,12 +313,13 @@ class ExtractTab(QWidget):
                 items.append((path_item.text(), row))
         
         self.is_working = True
+        self.cancel = threading.Event()
         self.set_ui_state(False)
         self.progress.setMaximum(count)
         self.progress.setValue(0)
         
         self.thread = QThread()
-        self.worker = ExtractWorker(items, self.output_dir)
+        self.worker = ExtractWorker(items, self.output_dir, cancel=self.cancel)
         self.worker.moveToThread(self.thread)
         
         self.thread.started.connect(self.worker.run)
@@ -301,7 +349,14 @@ class ExtractTab(QWidget):
         else:
             QMessageBox.warning(self, i18n.get('msg_done_title'), i18n.get('msg_done_fail', ok, fail, last_error))
 
+    def stop_extract(self):
+        # Set directly: the worker is busy in its thread (and deleted once finished)
+        if self.is_working:
+            self.cancel.set()
+            self.btn_stop.setEnabled(False)
+
     def set_ui_state(self, enabled):
+        self.btn_stop.setEnabled(not enabled)
         self.btn_add.setEnabled(enabled)
         self.btn_remove.setEnabled(enabled)
         self.btn_clear.setEnabled(enabled)